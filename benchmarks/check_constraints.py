@@ -0,0 +1,83 @@
+"""
+Benchmark DatabaseIntrospection._parse_column_constraint() against the
+sqlparse-based parser it replaces, after checking that both find the same
+columns for a set of DBMaker constraint texts.
+
+Run from the repository root:
+
+    python benchmarks/check_constraints.py
+
+pyodbc, Django and sqlparse must be importable; no database connection is
+opened.
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sqlparse
+
+from django_dbmaker.introspection import DatabaseIntrospection
+
+COLUMNS = ['id', 'qty', 'price', 'start_date', 'end_date', 'status', 'value']
+
+# (constraint text, columns) as get_constraints() passes them.
+CASES = [
+    ('qty >= 0', COLUMNS),
+    ('(qty >= 0)', COLUMNS),
+    ('"qty" >= 0 AND "price" >= 0', COLUMNS),
+    ("status IN ('qty', 'price', 'it''s')", COLUMNS),
+    ('end_date >= start_date', COLUMNS),
+    ('(price > 0 OR (qty = 0 AND status = 1)) AND id > 0', COLUMNS),
+    ('qty >= 0, price >= 0', COLUMNS),
+    ('qty >= 0) AND price >= 0', COLUMNS),
+    ('qty BETWEEN 1 AND 10e3', COLUMNS),
+    ('price*qty < 1000000.50', COLUMNS),
+    ('"unknown" > 0 AND other < qty', COLUMNS),
+    ('value >= 0', COLUMNS),
+]
+
+# A wide table: one PositiveIntegerField check per column.
+WIDE_COLUMNS = ['col_%d' % i for i in range(200)]
+WIDE = [('%s >= 0' % column, WIDE_COLUMNS) for column in WIDE_COLUMNS]
+
+
+def sqlparse_columns(sql, columns):
+    statement = sqlparse.parse(sql)[0]
+    tokens = (token for token in statement.flatten() if not token.is_whitespace)
+    braces_deep = 0
+    check_columns = []
+    for token in tokens:
+        if token.match(sqlparse.tokens.Punctuation, '('):
+            braces_deep += 1
+        elif token.match(sqlparse.tokens.Punctuation, ')'):
+            braces_deep -= 1
+            if braces_deep < 0:
+                break
+        elif braces_deep == 0 and token.match(sqlparse.tokens.Punctuation, ','):
+            break
+
+        if token.ttype in (sqlparse.tokens.Name, sqlparse.tokens.Keyword):
+            if token.value in columns:
+                check_columns.append(token.value)
+        elif token.ttype == sqlparse.tokens.Literal.String.Symbol:
+            if token.value[1:-1] in columns:
+                check_columns.append(token.value[1:-1])
+    return check_columns
+
+
+def main():
+    parse = DatabaseIntrospection(None)._parse_column_constraint
+    for sql, columns in CASES + WIDE:
+        expected = sqlparse_columns(sql, columns)
+        got = parse(sql, columns)
+        assert got == expected, (sql, got, expected)
+
+    for name, func in (('sqlparse', sqlparse_columns), ('tokenizer', parse)):
+        best = min(timeit.repeat(lambda: [func(sql, columns) for sql, columns in WIDE], number=1, repeat=5))
+        print('%-10s %8.2f ms per %d constraints' % (name, best * 1000, len(WIDE)))
+
+
+if __name__ == '__main__':
+    main()
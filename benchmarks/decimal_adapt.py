@@ -0,0 +1,55 @@
+"""
+Benchmark DatabaseOperations.adapt_decimalfield_value() against the
+format_number() -> Decimal(str) round trip it replaces.
+
+Run from the repository root:
+
+    python benchmarks/decimal_adapt.py
+
+Only Django is required; no database connection is opened.
+"""
+import os
+import sys
+import timeit
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from django.db.backends import utils
+
+from django_dbmaker.operations import DatabaseOperations
+
+# (max_digits, decimal_places) of six columns on a typical ledger row.
+COLUMNS = [(18, 2), (18, 2), (12, 4), (12, 4), (20, 6), (9, 0)]
+ROW = [Decimal('12345.678'), Decimal('-0.5'), Decimal('3.14159'),
+       Decimal('100'), Decimal('0.0000015'), Decimal('42')]
+ROWS = 10000
+
+
+def string_round_trip():
+    for _ in range(ROWS):
+        for value, (max_digits, decimal_places) in zip(ROW, COLUMNS):
+            Decimal(utils.format_number(value, max_digits, decimal_places))
+
+
+def fast_path(ops=DatabaseOperations(None)):
+    adapt = ops.adapt_decimalfield_value
+    for _ in range(ROWS):
+        for value, (max_digits, decimal_places) in zip(ROW, COLUMNS):
+            adapt(value, max_digits, decimal_places)
+
+
+def main():
+    ops = DatabaseOperations(None)
+    for value, (max_digits, decimal_places) in zip(ROW, COLUMNS):
+        expected = Decimal(utils.format_number(value, max_digits, decimal_places))
+        got = ops.adapt_decimalfield_value(value, max_digits, decimal_places)
+        assert got.as_tuple() == expected.as_tuple(), (value, got, expected)
+
+    for name, func in (('string round trip', string_round_trip), ('fast path', fast_path)):
+        best = min(timeit.repeat(func, number=1, repeat=5))
+        print('%-18s %8.1f ms per %d rows' % (name, best * 1000, ROWS))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark exact lookups on a TextField kept digested by a DigestField: the
+digest probe ("digest" = %s AND "url" = %s) against the probe that also
+accepted rows with a NULL digest, which kept DBMaker off the digest index.
+
+Run from the repository root against a scratch DBMaker database:
+
+    DBMAKER_NAME=bench DBMAKER_USER=SYSADM python benchmarks/digest_lookup.py
+
+DBMAKER_PASSWORD, DBMAKER_HOST and DBMAKER_DRIVER are read as well. A
+table, bench_page, is created and dropped again.
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import django
+from django.conf import settings
+
+settings.configure(DATABASES={'default': {
+    'ENGINE': 'django_dbmaker',
+    'NAME': os.environ['DBMAKER_NAME'],
+    'USER': os.environ.get('DBMAKER_USER', 'SYSADM'),
+    'PASSWORD': os.environ.get('DBMAKER_PASSWORD', ''),
+    'HOST': os.environ.get('DBMAKER_HOST', ''),
+    'OPTIONS': {'driver': os.environ.get('DBMAKER_DRIVER', 'DBMaker 5.4 Driver')},
+}})
+django.setup()
+
+from django.db import connection, models
+from django.db.models import F, Value
+from django.db.models.functions import Concat
+from django.db.models.lookups import Exact
+
+from django_dbmaker.fields import DigestField, digest_field_for, text_digest
+
+PAGES = 100000
+LOOKUPS = 200
+
+
+class Page(models.Model):
+    url = models.TextField()
+    url_digest = DigestField(source='url')
+
+    class Meta:
+        app_label = 'bench'
+        db_table = 'bench_page'
+
+
+def or_null_probe(self, compiler, connection):
+    sql, params = self.as_sql(compiler, connection)
+    digest = digest_field_for(self.lhs.target.model, self.lhs.target.name)
+    column = '%s.%s' % (
+        compiler.quote_name_unless_alias(self.lhs.alias),
+        compiler.quote_name_unless_alias(digest.column),
+    )
+    return (
+        '((%s = %%s OR %s IS NULL) AND %s)' % (column, column, sql),
+        [text_digest(self.rhs)] + list(params),
+    )
+
+
+def main():
+    with connection.schema_editor() as editor:
+        editor.create_model(Page)
+    try:
+        Page.objects.bulk_create(
+            (Page(id=i, url='https://example.com/page/%d' % i) for i in range(1, PAGES + 1)),
+            batch_size=1000,
+        )
+        # Digests of updates from expressions are filled in afterwards.
+        Page.objects.filter(id__lte=10).update(url=Concat(F('url'), Value('/')))
+        assert not Page.objects.filter(url_digest__isnull=True).exists()
+        urls = ['https://example.com/page/%d' % i for i in random.sample(range(11, PAGES + 1), LOOKUPS)]
+
+        def lookups():
+            for url in urls:
+                assert Page.objects.filter(url=url).exists()
+
+        digest = min(timeit.repeat(lookups, number=1, repeat=5))
+        as_dbmaker, Exact.as_dbmaker = Exact.as_dbmaker, or_null_probe
+        try:
+            or_null = min(timeit.repeat(lookups, number=1, repeat=5))
+        finally:
+            Exact.as_dbmaker = as_dbmaker
+        print('%-22s %8.1f ms' % ('digest OR IS NULL', or_null * 1000))
+        print('%-22s %8.1f ms' % ('digest only', digest * 1000))
+    finally:
+        with connection.schema_editor() as editor:
+            editor.delete_model(Page)
+
+
+if __name__ == '__main__':
+    main()
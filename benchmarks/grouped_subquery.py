@@ -0,0 +1,100 @@
+"""
+Benchmark a grouped query selecting a Subquery annotation, with a selective
+filter, with and without the outer WHERE clause pushed into the derived
+table that SQLCompiler._lift_grouped_subqueries() builds.
+
+Run from the repository root against a scratch DBMaker database:
+
+    DBMAKER_NAME=bench DBMAKER_USER=SYSADM python benchmarks/grouped_subquery.py
+
+DBMAKER_PASSWORD, DBMAKER_HOST and DBMAKER_DRIVER are read as well. Two
+tables, bench_author and bench_book, are created and dropped again.
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import django
+from django.conf import settings
+
+settings.configure(DATABASES={'default': {
+    'ENGINE': 'django_dbmaker',
+    'NAME': os.environ['DBMAKER_NAME'],
+    'USER': os.environ.get('DBMAKER_USER', 'SYSADM'),
+    'PASSWORD': os.environ.get('DBMAKER_PASSWORD', ''),
+    'HOST': os.environ.get('DBMAKER_HOST', ''),
+    'OPTIONS': {'driver': os.environ.get('DBMAKER_DRIVER', 'DBMaker 5.4 Driver')},
+}})
+django.setup()
+
+from django.db import connection, models
+from django.db.models import Count, Max, OuterRef, Subquery
+
+from django_dbmaker.compiler import SQLCompiler
+
+AUTHORS = 20000
+BOOKS_PER_AUTHOR = 5
+
+
+class Author(models.Model):
+    name = models.CharField(max_length=50, db_index=True)
+
+    class Meta:
+        app_label = 'bench'
+        db_table = 'bench_author'
+
+
+class Book(models.Model):
+    author = models.ForeignKey(Author, models.CASCADE)
+    price = models.IntegerField()
+
+    class Meta:
+        app_label = 'bench'
+        db_table = 'bench_book'
+
+
+def query():
+    top = Subquery(
+        Book.objects.filter(author=OuterRef('pk')).order_by()
+        .values('author').annotate(m=Max('price')).values('m')
+    )
+    # A few dozen authors out of AUTHORS.
+    return list(
+        Author.objects.filter(name__startswith='author 1999')
+        .annotate(top=top).values('top').annotate(n=Count('id'))
+    )
+
+
+def main():
+    with connection.schema_editor() as editor:
+        editor.create_model(Author)
+        editor.create_model(Book)
+    try:
+        Author.objects.bulk_create(
+            Author(id=i, name='author %d' % i) for i in range(1, AUTHORS + 1)
+        )
+        Book.objects.bulk_create(
+            Book(author_id=i, price=(i * 7 + j) % 100)
+            for i in range(1, AUTHORS + 1) for j in range(BOOKS_PER_AUTHOR)
+        )
+        pushed = query()
+        restriction = SQLCompiler._base_restriction
+        SQLCompiler._base_restriction = lambda self, pk: ('', [])
+        try:
+            assert sorted(query(), key=repr) == sorted(pushed, key=repr)
+            whole = min(timeit.repeat(query, number=1, repeat=5))
+        finally:
+            SQLCompiler._base_restriction = restriction
+        best = min(timeit.repeat(query, number=1, repeat=5))
+        print('%-22s %8.1f ms' % ('whole inner table', whole * 1000))
+        print('%-22s %8.1f ms' % ('WHERE pushed down', best * 1000))
+    finally:
+        with connection.schema_editor() as editor:
+            editor.delete_model(Book)
+            editor.delete_model(Author)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Measure how long a fresh interpreter takes to import and instantiate the
+backend's DatabaseWrapper, and which of its optional modules get loaded
+along the way.
+
+Run from the repository root:
+
+    python benchmarks/import_time.py
+
+pyodbc and Django must be importable; no database connection is opened.
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 10
+
+# Modules that should only be imported once the connection needs them.
+# (sqlparse isn't listed: Django's own BaseDatabaseOperations imports it.)
+LAZY_MODULES = (
+    'django_dbmaker.schema',
+    'django_dbmaker.creation',
+    'django_dbmaker.client',
+    'django_dbmaker.introspection',
+)
+
+SCRIPT = r'''
+import sys, time
+from django.conf import settings
+settings.configure()
+# Time the backend alone, not Django's own database layer.
+import django.db.backends.base.base, django.db.backends.base.operations
+start = time.perf_counter()
+from django_dbmaker.base import DatabaseWrapper
+DatabaseWrapper({
+    'NAME': 'x', 'USER': '', 'PASSWORD': '', 'HOST': '', 'PORT': '',
+    'OPTIONS': {}, 'TIME_ZONE': None, 'CONN_MAX_AGE': 0, 'AUTOCOMMIT': True,
+    'ATOMIC_REQUESTS': False,
+})
+elapsed = time.perf_counter() - start
+print(elapsed)
+print(' '.join(name for name in %r if name in sys.modules))
+''' % (LAZY_MODULES,)
+
+
+def run_once():
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')])))
+    output = subprocess.check_output([sys.executable, '-c', SCRIPT], env=env, universal_newlines=True)
+    elapsed, loaded = (output.splitlines() + [''])[:2]
+    return float(elapsed), loaded.split()
+
+
+def main():
+    timings = []
+    loaded = []
+    for _ in range(RUNS):
+        elapsed, loaded = run_once()
+        timings.append(elapsed)
+    print('import + DatabaseWrapper(): best %.1f ms, median %.1f ms over %d runs' % (
+        min(timings) * 1000, sorted(timings)[len(timings) // 2] * 1000, RUNS))
+    print('lazy modules loaded at startup: %s' % (', '.join(loaded) or 'none'))
+
+
+if __name__ == '__main__':
+    main()
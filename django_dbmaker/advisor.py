@@ -0,0 +1,264 @@
+"""
+Index advice from the queries an application actually runs.
+
+With the ``query_stats_file`` option set, the SQL compiler records for every
+query it executes which columns each table is probed on: by equality (and
+IN, and join conditions), by range, and for the base table, by ORDER BY.
+Queries of the same shape are counted together with their total time, and
+appended as JSON lines to the file when the connection closes, so several
+processes can share it.
+
+IndexAdvisor matches these against the indexes of the database and ranks
+the missing ones by the time spent in the queries they would serve; indexes
+no recorded query could use are listed separately.
+"""
+from collections import defaultdict, namedtuple
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models.expressions import Col, OrderBy, Subquery
+from django.db.models.sql.datastructures import Join
+
+# Lookups an index can serve, leading with an equality.
+EQUALITY_LOOKUPS = {'exact', 'in', 'isnull'}
+# Lookups an index can serve as a range scan after the equalities.
+RANGE_LOOKUPS = {'gt', 'gte', 'lt', 'lte', 'range', 'startswith'}
+# Longest index suggested.
+MAX_INDEX_COLUMNS = 4
+
+Usage = namedtuple('Usage', 'table equality range order')
+Suggestion = namedtuple('Suggestion', 'table columns count time extends')
+UnusedIndex = namedtuple('UnusedIndex', 'table name columns')
+
+
+class QueryStats:
+    """
+    Column usage per table, keyed by Usage, with the number of executions
+    and their total time in seconds.
+    """
+    # Executions recorded between writes to the file.
+    flush_every = 1000
+
+    def __init__(self, path=None):
+        self.path = path
+        self.usage = defaultdict(lambda: [0, 0.0])
+        self._pending = 0
+
+    def record(self, query, duration):
+        for usage in query_usage(query):
+            entry = self.usage[usage]
+            entry[0] += 1
+            entry[1] += duration
+        self._pending += 1
+        if self.path and self._pending >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """
+        Append the recorded usage to the stats file and start over.
+        """
+        if self.path and self.usage:
+            lines = [
+                json.dumps({
+                    'table': usage.table, 'equality': usage.equality, 'range': usage.range,
+                    'order': usage.order, 'count': count, 'time': round(duration, 6),
+                })
+                for usage, (count, duration) in self.usage.items()
+            ]
+            # One write per flush, so lines from other processes don't interleave.
+            with open(self.path, 'a') as f:
+                f.write(''.join(line + '\n' for line in lines))
+            self.usage.clear()
+        self._pending = 0
+
+    def load(self, path):
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                usage = Usage(
+                    data['table'], tuple(data['equality']), tuple(data['range']), tuple(data['order']),
+                )
+                entry = self.usage[usage]
+                entry[0] += data['count']
+                entry[1] += data['time']
+        return self
+
+
+def query_usage(query):
+    """
+    Return the Usage of every table the query (and its subqueries) filters,
+    joins or sorts on.
+    """
+    probes = defaultdict(lambda: (set(), set()))
+    order = ()
+    queries = [query]
+    while queries:
+        query = queries.pop()
+        # Joins set up while resolving a filter but then trimmed have no references.
+        tables = {
+            alias: join.table_name for alias, join in query.alias_map.items()
+            if query.alias_refcount.get(alias, 1)
+        }
+        for alias, join in query.alias_map.items():
+            if alias in tables and isinstance(join, Join):
+                # The joined table is looked up by its side of the condition.
+                probes[join.table_name][0].update(column for _, column in join.join_cols)
+        for annotation in query.annotations.values():
+            queries.extend(
+                expression.queryset.query for expression in annotation.flatten()
+                if isinstance(expression, Subquery)
+            )
+        nodes = [query.where]
+        while nodes:
+            node = nodes.pop()
+            if hasattr(node, 'children'):
+                nodes.extend(node.children)
+                continue
+            for side in (getattr(node, 'lhs', None), getattr(node, 'rhs', None)):
+                if hasattr(side, 'where') and hasattr(side, 'alias_map'):
+                    queries.append(side)
+                elif isinstance(side, Subquery):
+                    queries.append(side.queryset.query)
+            lhs = getattr(node, 'lhs', None)
+            if not isinstance(lhs, Col) or lhs.alias not in tables:
+                continue
+            if node.lookup_name in EQUALITY_LOOKUPS:
+                probes[tables[lhs.alias]][0].add(lhs.target.column)
+            elif node.lookup_name in RANGE_LOOKUPS:
+                probes[tables[lhs.alias]][1].add(lhs.target.column)
+            if isinstance(node.rhs, Col) and node.rhs.alias in tables:
+                probes[tables[node.rhs.alias]][0].add(node.rhs.target.column)
+        if not order and query.model is not None and query.alias_map:
+            order = (query.get_meta().db_table, _order_columns(query))
+    if order and order[1]:
+        probes[order[0]]
+    return [
+        Usage(
+            table, tuple(sorted(equality)), tuple(sorted(range_ - equality)),
+            order[1] if order and order[0] == table else (),
+        )
+        for table, (equality, range_) in probes.items()
+    ]
+
+
+def _order_columns(query):
+    """
+    Return the base table columns the query is sorted on, in order, as far
+    as they can be told without compiling the query.
+    """
+    opts = query.get_meta()
+    ordering = query.order_by or query.extra_order_by
+    if not ordering and query.default_ordering:
+        ordering = opts.ordering
+    columns = []
+    for item in ordering:
+        if isinstance(item, OrderBy):
+            item = item.expression
+        if isinstance(item, Col):
+            columns.append(item.target.column)
+            continue
+        if not isinstance(item, str) or '__' in item or item.startswith('?'):
+            break
+        name = item.lstrip('-+')
+        if name == 'pk':
+            name = opts.pk.name
+        try:
+            field = opts.get_field(name)
+        except FieldDoesNotExist:
+            break
+        if not field.concrete or field.is_relation and not field.many_to_one:
+            break
+        columns.append(field.column)
+    return tuple(columns)
+
+
+class IndexAdvisor:
+    """
+    Compare recorded column usage with the indexes of the database.
+    """
+
+    def __init__(self, connection, stats):
+        self.connection = connection
+        self.stats = stats
+        self._indexes = {}
+
+    def indexes(self, table):
+        """
+        Return {name: (columns, unique, primary_key)} for the indexes of
+        ``table``.
+        """
+        if table not in self._indexes:
+            with self.connection.cursor() as cursor:
+                constraints = self.connection.introspection.get_constraints(cursor, table)
+            self._indexes[table] = {
+                name: (list(info['columns']), info['unique'], info['primary_key'])
+                for name, info in constraints.items()
+                if info['index'] or info['primary_key'] or info['unique']
+            }
+        return self._indexes[table]
+
+    def tables(self):
+        with self.connection.cursor() as cursor:
+            return set(self.connection.introspection.table_names(cursor))
+
+    def suggestions(self):
+        """
+        Return the missing indexes as Suggestions, the most time spent first.
+        ``extends`` names an existing index on a prefix of the columns.
+        """
+        tables = self.tables()
+        candidates = defaultdict(lambda: [0, 0.0])
+        for usage, (count, duration) in self.stats.usage.items():
+            if usage.table not in tables:
+                continue
+            columns = usage.equality + (usage.range[:1] or usage.order)
+            if columns:
+                entry = candidates[usage.table, columns[:MAX_INDEX_COLUMNS], len(usage.equality)]
+                entry[0] += count
+                entry[1] += duration
+        suggestions = []
+        for (table, columns, equalities), (count, duration) in candidates.items():
+            covered, extends = False, None
+            for name, (index_columns, _, _) in self.indexes(table).items():
+                if _serves(index_columns, columns, equalities):
+                    covered = True
+                    break
+                for length in range(len(columns) - 1, 0, -1):
+                    if _serves(index_columns[:length], columns[:length], min(equalities, length)):
+                        extends = name
+                        break
+            if not covered:
+                suggestions.append(Suggestion(table, columns, count, duration, extends))
+        suggestions.sort(key=lambda s: (-s.time, -s.count, s.table, s.columns))
+        return suggestions
+
+    def unused_indexes(self):
+        """
+        Return the plain indexes whose leading column no recorded query
+        filters, joins or sorts on. Primary keys and unique constraints are
+        left out: they enforce integrity.
+        """
+        used = defaultdict(set)
+        for usage in self.stats.usage:
+            used[usage.table].update(usage.equality, usage.range, usage.order[:1])
+        unused = []
+        for table in sorted(self.tables()):
+            for name, (columns, unique, primary_key) in sorted(self.indexes(table).items()):
+                if columns and not unique and not primary_key and columns[0] not in used[table]:
+                    unused.append(UnusedIndex(table, name, columns))
+        return unused
+
+
+def _serves(index_columns, columns, equalities):
+    """
+    Return whether an index on ``index_columns`` serves a lookup on
+    ``columns`` whose first ``equalities`` columns may come in any order.
+    """
+    if len(index_columns) < len(columns):
+        return False
+    return (
+        set(index_columns[:equalities]) == set(columns[:equalities]) and
+        list(index_columns[equalities:len(columns)]) == list(columns[equalities:])
+    )
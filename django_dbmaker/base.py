@@ -44,12 +44,17 @@
 """
 DBMaker database backend for Django.
 """
+import collections
+from concurrent.futures import ThreadPoolExecutor
 import datetime
+from importlib import import_module
 import logging
 import os
 import re
 import sys
+import threading
 from time import time
+import uuid
 import warnings
 
 from django.core.exceptions import ImproperlyConfigured
@@ -68,12 +73,15 @@ except ImportError:
 #logger.addHandler(handler)
 #logger.debug('This is a DEBUG message')
 
-m = re.match(r'(\d+)\.(\d+)\.(\d+)(?:-beta(\d+))?', Database.version)
-vlist = list(m.groups())
-if vlist[3] is None: vlist[3] = '9999'
-pyodbc_ver = tuple(map(int, vlist))
-if pyodbc_ver < (2, 0, 38, 9999):
-    raise ImproperlyConfigured("pyodbc 2.0.38 or newer is required; you have %s" % Database.version)
+logger = logging.getLogger('django.db.backends')
+
+def _check_pyodbc_version():
+    m = re.match(r'(\d+)\.(\d+)\.(\d+)(?:-beta(\d+))?', Database.version)
+    vlist = list(m.groups())
+    if vlist[3] is None: vlist[3] = '9999'
+    pyodbc_ver = tuple(map(int, vlist))
+    if pyodbc_ver < (2, 0, 38, 9999):
+        raise ImproperlyConfigured("pyodbc 2.0.38 or newer is required; you have %s" % Database.version)
 
 from django.db import utils
 try:
@@ -85,6 +93,7 @@ except ImportError:
 from django.db.backends.signals import connection_created
 
 from django.conf import settings
+from django.utils.functional import SimpleLazyObject, cached_property, empty
 from django import VERSION as DjangoVersion
 if DjangoVersion[:2] == (2, 2):
     _DJANGO_VERSION = 22
@@ -98,16 +107,114 @@ else:
         raise ImproperlyConfigured("Django %d.%d is not supported." % DjangoVersion[:2])
 
 from django_dbmaker.operations import DatabaseOperations
-from django_dbmaker.client import DatabaseClient
 from django.utils import timezone
-from django_dbmaker.creation import DatabaseCreation
-from django_dbmaker.introspection import DatabaseIntrospection
-from .schema import DatabaseSchemaEditor
 from .features import DatabaseFeatures
 
 DatabaseError = Database.Error
 IntegrityError = Database.IntegrityError
 
+class LazyComponent(object):
+    """
+    Stand-in for a backend component class. The component's module is only
+    imported, and the component built, when the connection first uses it.
+    """
+    def __init__(self, path):
+        self.module_name, self.class_name = path.rsplit('.', 1)
+
+    def load(self):
+        return getattr(import_module(self.module_name), self.class_name)
+
+    def __call__(self, connection):
+        return SimpleLazyObject(lambda: self.load()(connection))
+
+_case_token_re = re.compile(r'\bCASE\b|\bEND\b|%s')
+
+# Statements that don't change the schema; see DatabaseWrapper.is_schema_change().
+_non_ddl_re = re.compile(
+    r'^\s*(?:SELECT|INSERT|UPDATE|DELETE|CALL|SET|SAVEPOINT|ROLLBACK|REMOVE\s+SAVEPOINT|COMMIT)\b',
+    re.IGNORECASE,
+)
+# A table name as written in a statement, optionally qualified by its owner.
+_table_name = r'((?:"[^"]+"|[^\s(".;]+)(?:\.(?:"[^"]+"|[^\s(".;]+))?)'
+_name_part_re = re.compile(r'"[^"]+"|[^".]+')
+_insert_re = re.compile(r'^\s*INSERT\s+INTO\s+' + _table_name, re.IGNORECASE)
+_delete_all_re = re.compile(r'^\s*DELETE\s+FROM\s+' + _table_name + r'\s*;?\s*$', re.IGNORECASE)
+# The statement DatabaseOperations.sequence_reset_by_name_sql() restarts a
+# SERIAL column with.
+_serial_restart_re = re.compile(
+    r'^\s*ALTER\s+TABLE\s+' + _table_name +
+    r'\s+MODIFY\s+COLUMN\s+\S+\s+TYPE\s+TO\s+(?:BIG)?SERIAL\(\d+\)\s*;?\s*$',
+    re.IGNORECASE,
+)
+_create_temp_table_re = re.compile(r'^\s*CREATE\s+TEMP(?:ORARY)?\s+TABLE\s+' + _table_name, re.IGNORECASE)
+_drop_table_re = re.compile(r'^\s*DROP\s+TABLE\s+' + _table_name + r'\s*;?\s*$', re.IGNORECASE)
+
+
+class WrittenTables(object):
+    """
+    The tables of one database known to be empty, as far as the connections
+    of this process can tell: a table becomes empty when a DELETE of all its
+    rows commits, and stops being so on the next INSERT into it. Likewise
+    the tables whose SERIAL counter was restarted and that got no row since.
+    Any other schema change forgets everything.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.empty = set()
+        self.serial_restarted = set()
+        self.inserts = collections.Counter()
+
+    def inserted(self, table):
+        with self.lock:
+            self.inserts[table] += 1
+            self.empty.discard(table)
+            self.serial_restarted.discard(table)
+
+    def restarted_serial(self, table):
+        with self.lock:
+            self.serial_restarted.add(table)
+
+    def deleted_all(self, table):
+        """
+        Return a callback marking ``table`` empty, to run once the DELETE
+        commits; it does nothing if rows were inserted meanwhile.
+        """
+        inserts = self.inserts[table]
+
+        def commit():
+            with self.lock:
+                if self.inserts[table] == inserts:
+                    self.empty.add(table)
+        return commit
+
+    def forget(self):
+        with self.lock:
+            self.empty.clear()
+            self.serial_restarted.clear()
+
+    def is_empty(self, table):
+        return table in self.empty
+
+    def serial_at_start(self, table):
+        return table in self.serial_restarted
+
+# WrittenTables per (HOST, NAME), shared by all the connections to a database.
+_written_tables = collections.defaultdict(WrittenTables)
+
+def _case_has_params(sql):
+    """
+    Return True if a placeholder appears inside a CASE ... END expression.
+    """
+    depth = 0
+    for token in _case_token_re.findall(sql):
+        if token == 'CASE':
+            depth += 1
+        elif token == 'END':
+            depth = max(depth - 1, 0)
+        elif depth:
+            return True
+    return False
+
 class DatabaseWrapper(BaseDatabaseWrapper):
     vendor = 'dbmaker'
     display_name = 'dbmaker'
@@ -162,6 +269,13 @@ class DatabaseWrapper(BaseDatabaseWrapper):
         'UUIDField':                    'char(32)',       
     }
 
+    # Smaller column types, opted into per group by OPTIONS['compact_types'].
+    compact_data_types = {
+        'boolean': {'BooleanField': 'smallint', 'NullBooleanField': 'smallint'},
+        # Fields that can only hold ASCII text; see also fields.AsciiCharField.
+        'varchar': {'GenericIPAddressField': 'varchar(39)'},
+    }
+
     data_type_check_constraints = {
         'PositiveIntegerField': '"%(column)s" >= 0',
         'PositiveSmallIntegerField': '"%(column)s" >= 0',
@@ -215,16 +329,64 @@ class DatabaseWrapper(BaseDatabaseWrapper):
 
     # In Django 1.8 data_types was moved from DatabaseCreation to DatabaseWrapper.
     # See https://docs.djangoproject.com/en/1.10/releases/1.8/#database-backend-api
-    SchemaEditorClass = DatabaseSchemaEditor
     features_class = DatabaseFeatures
     ops_class = DatabaseOperations
-    client_class = DatabaseClient
-    creation_class = DatabaseCreation
-    introspection_class = DatabaseIntrospection
+    client_class = LazyComponent('django_dbmaker.client.DatabaseClient')
+    creation_class = LazyComponent('django_dbmaker.creation.DatabaseCreation')
+    introspection_class = LazyComponent('django_dbmaker.introspection.DatabaseIntrospection')
     validation_class = BaseDatabaseValidation  
+    # OPTIONS consumed by the backend itself rather than by pyodbc.connect().
+    backend_options = (
+        'explain_threshold', 'explain_capture_size', 'compiled_sql_cache_size',
+        'schema_snapshot', 'ddl_jobs', 'table_storage', 'online_alter_batch_size',
+        'compact_types', 'query_stats_file', 'test_template_dir',
+    )
+
     def __init__(self, *args, **kwargs):
         super(DatabaseWrapper, self).__init__(*args, **kwargs)
         self.test_create = self.settings_dict.get('TEST_CREATE', True)
+        options = self.settings_dict.get('OPTIONS', {})
+        # Statements slower than explain_threshold seconds get their plan
+        # recorded in captured_plans.
+        self.explain_threshold = options.get('explain_threshold')
+        self.captured_plans = collections.deque(maxlen=options.get('explain_capture_size', 100))
+        self._capturing_plan = False
+        # SQL generated by SQLCompiler, keyed by query shape. A size of 0
+        # disables the cache.
+        self.compiled_sql_cache_size = options.get('compiled_sql_cache_size', 0)
+        self.compiled_sql_cache = collections.OrderedDict() if self.compiled_sql_cache_size else None
+        # Column usage of the queries run, for the index advisor.
+        self.query_stats = None
+        if options.get('query_stats_file'):
+            from .advisor import QueryStats
+            self.query_stats = QueryStats(options['query_stats_file'])
+        # When a list, every schema-changing statement run on this connection
+        # is appended to it as (sql, params); see DatabaseCreation.
+        self.ddl_log = None
+        # Set by a schema editor holding queued DDL that must run before any
+        # other statement on this connection.
+        self.pending_ddl = None
+        # The temporary tables this connection created, which no other
+        # connection sees.
+        self.temp_tables = set()
+        compact_types = options.get('compact_types') or ()
+        if compact_types is True:
+            compact_types = self.compact_data_types
+        unknown = set(compact_types) - set(self.compact_data_types)
+        if unknown:
+            raise ImproperlyConfigured(
+                "Unknown compact_types: %s. Choose from %s." % (
+                    ', '.join(sorted(unknown)), ', '.join(sorted(self.compact_data_types))))
+        self.compact_types = frozenset(compact_types)
+        if self.compact_types:
+            self.data_types = dict(self.data_types)
+            for name in self.compact_types:
+                self.data_types.update(self.compact_data_types[name])
+
+    @cached_property
+    def SchemaEditorClass(self):
+        from .schema import DatabaseSchemaEditor
+        return DatabaseSchemaEditor
 
     def get_connection_params(self):
         settings_dict = self.settings_dict
@@ -247,7 +409,10 @@ class DatabaseWrapper(BaseDatabaseWrapper):
             'database': settings_dict['NAME'] or 'dbsample5',
             #**settings_dict['OPTIONS'],
         }
-        conn_params.update(settings_dict['OPTIONS'])
+        conn_params.update(
+            (k, v) for k, v in settings_dict['OPTIONS'].items()
+            if k not in self.backend_options
+        )
 
         if settings_dict['USER']:
             conn_params['user'] = settings_dict['USER']
@@ -260,6 +425,7 @@ class DatabaseWrapper(BaseDatabaseWrapper):
         return conn_params
 
     def get_new_connection(self, conn_params):
+        _check_pyodbc_version()
         connection = Database.connect(**conn_params)
         return connection
 
@@ -319,6 +485,96 @@ class DatabaseWrapper(BaseDatabaseWrapper):
         connectionstring = ';'.join(cstr_parts)
         return connectionstring
 
+    @property
+    def written_tables(self):
+        return _written_tables[self.settings_dict['HOST'], self.settings_dict['NAME']]
+
+    def note_write(self, sql):
+        """
+        Keep written_tables and the introspection snapshot up to date with a
+        statement run on this connection.
+        """
+        match = _insert_re.match(sql)
+        if match:
+            self.written_tables.inserted(self.written_table_key(match.group(1)))
+            return
+        match = _delete_all_re.match(sql)
+        if match:
+            # Outside a transaction block with autocommit off, when the DELETE
+            # commits isn't known.
+            if self.in_atomic_block or self.get_autocommit():
+                self.on_commit(self.written_tables.deleted_all(self.written_table_key(match.group(1))))
+            return
+        match = _serial_restart_re.match(sql)
+        if match:
+            # Only the counter changed; what is known about other tables holds.
+            self.written_tables.restarted_serial(self.written_table_key(match.group(1)))
+            self.invalidate_schema_snapshot(sql)
+            return
+        match = _create_temp_table_re.match(sql)
+        if match:
+            self.temp_tables.add(self.written_table_key(match.group(1)))
+            return
+        if self.is_schema_change(sql):
+            self.written_tables.forget()
+            self.invalidate_schema_snapshot(sql)
+            return
+        match = _drop_table_re.match(sql)
+        if match:
+            # One of this connection's temporary tables.
+            self.temp_tables.discard(self.written_table_key(match.group(1)))
+
+    def is_schema_change(self, sql):
+        """
+        Return whether ``sql`` may change the schema other connections see:
+        anything but DML, transaction control and the DDL of this
+        connection's temporary tables.
+        """
+        if _non_ddl_re.match(sql) or _create_temp_table_re.match(sql):
+            return False
+        match = _drop_table_re.match(sql)
+        return not (match and self.written_table_key(match.group(1)) in self.temp_tables)
+
+    def written_table_key(self, name):
+        """
+        Return the name written_tables knows the table ``name`` by: without
+        quotes or owner, compared as introspection compares identifiers.
+        """
+        name = _name_part_re.findall(name)[-1].strip('"')
+        return self.introspection.identifier_converter(name)
+
+    def map_on_copies(self, func, chunks):
+        """
+        Call ``func(cursor, chunk)`` for each chunk from its own worker
+        thread, on a copy of this connection, and return the results in the
+        order of ``chunks``.
+        """
+        def run(chunk):
+            # Each worker owns its connection; DatabaseWrapper isn't shared
+            # between threads.
+            connection = self.copy()
+            try:
+                with connection.cursor() as cursor:
+                    return func(cursor, chunk)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=max(len(chunks), 1)) as executor:
+            return list(executor.map(run, chunks))
+
+    def invalidate_schema_snapshot(self, sql=None):
+        # Nothing is cached if introspection was never used.
+        if getattr(self.introspection, '_wrapped', None) is not empty:
+            self.introspection.invalidate_schema_snapshot(sql)
+
+    def _close(self):
+        # Other connections may change the schema while this one is closed.
+        self.invalidate_schema_snapshot()
+        self.temp_tables.clear()
+        if self.query_stats is not None:
+            self.query_stats.flush()
+        return super(DatabaseWrapper, self)._close()
+
     def create_cursor(self, name=None):
         return CursorWrapper(self.connection.cursor(), self)
 
@@ -343,6 +599,29 @@ class DatabaseWrapper(BaseDatabaseWrapper):
         #cursor.execute('EXEC sp_msforeachtable "ALTER TABLE ? WITH CHECK CHECK CONSTRAINT ALL"')
         self.check_constraints()
     
+    def capture_query_plan(self, sql, params, duration):
+        """
+        Record the execution plan of a statement that exceeded
+        explain_threshold. Failures are logged and otherwise ignored.
+        """
+        self._capturing_plan = True
+        cursor = self.create_cursor()
+        try:
+            plan = self.ops.fetch_query_plan(cursor, sql, params)
+        except (Database.Error, utils.Error) as e:
+            logger.warning('Could not capture plan for slow query: %s', e)
+            return
+        finally:
+            cursor.close()
+            self._capturing_plan = False
+        self.captured_plans.append({
+            'sql': sql,
+            'params': params,
+            'time': '%.3f' % duration,
+            'plan': plan,
+        })
+        logger.info('(%.3f) %s; args=%s\n%s', duration, sql, params, '\n'.join(plan))
+
     def is_usable(self):
         try:
             # Use a psycopg cursor directly, bypassing Django's utilities.
@@ -358,6 +637,10 @@ class CursorWrapper(object):
     A wrapper around the pyodbc's cursor that takes in account a) some pyodbc
     DB-API 2.0 implementation and b) some common ODBC driver particularities.
     """
+    # Capturing a plan runs the statement again, relying on PLANONLY to keep
+    # it from executing; only reads are safe should that fail.
+    plannable_statements = ('SELECT',)
+
     def __init__(self, cursor, connection):
         self.active = True
         self.cursor = cursor
@@ -413,9 +696,27 @@ class CursorWrapper(object):
         else:
             return str(value)
 
-    def execute(self, sql, params=()):       
+    def execute(self, sql, params=()):
+        if self.connection.pending_ddl is not None:
+            self.connection.pending_ddl()
+        if self.connection.ddl_log is not None and self.connection.is_schema_change(sql):
+            self.connection.ddl_log.append((sql, tuple(params or ())))
+        threshold = self.connection.explain_threshold
+        if threshold is None or self.connection._capturing_plan:
+            result = self._execute(sql, params)
+        else:
+            start = time()
+            result = self._execute(sql, params)
+            duration = time() - start
+            if duration >= threshold and sql.lstrip()[:6].upper() in self.plannable_statements:
+                self.connection.capture_query_plan(sql, params, duration)
+        self.connection.note_write(sql)
+        return result
+
+    def _execute(self, sql, params=()):
         self.last_sql = sql
-        if (('CASE WHEN' in sql) or
+        # DBMaker can't bind parameters inside CASE expressions.
+        if (('CASE WHEN' in sql and _case_has_params(sql)) or
             ( '(%s) AS' in sql) or
             ('LIKE %s' in sql)) and params is not None:
             sql = sql % tuple(map(self.quote_value, params))
@@ -445,6 +746,9 @@ class CursorWrapper(object):
             raise utils.DatabaseError(*e.args)
         
     def executemany(self, sql, params_list):
+        if self.connection.pending_ddl is not None:
+            self.connection.pending_ddl()
+        self.connection.note_write(sql)
         sql = self.format_sql(sql)
         # pyodbc's cursor.executemany() doesn't support an empty param_list
         if not params_list:
@@ -41,48 +41,553 @@
 # SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 import re
+from time import time
+from django.core.exceptions import EmptyResultSet
+from django.db import NotSupportedError, transaction
+from django.db.backends.utils import truncate_name
+from django.db.models.constraints import UniqueConstraint
 from django.db.models.sql import compiler, where
 from django.db.models.aggregates import Avg
-from django.db.models.expressions import OrderBy
+from django.db.models.expressions import Case, Col, OrderBy, RawSQL, Subquery, Value, When
+from django.db.models.lookups import Exact
+from django.db.models.sql.constants import GET_ITERATOR_CHUNK_SIZE, INNER, LOUTER, MULTI
+from django.db.models.sql.query import Query
+from django.utils.hashable import make_hashable
+from django.conf import settings
+from django.utils import timezone
 import django
-import types
+
+from .fields import digest_field_for, fill_digests, text_digest
 
 def _as_sql_agv(self, compiler, connection):
     return self.as_sql(compiler, connection,  template='%(function)s(CAST(%(field)s AS FLOAT))')
 
+def _is_nullable(expression, compiler):
+    if isinstance(expression, Col):
+        join = compiler.query.alias_map.get(expression.alias)
+        return expression.target.null or getattr(join, 'join_type', None) == LOUTER
+    return True
+
 def _as_sql_order_by(self, compiler, connection):
     template = None
-    if self.nulls_last:
-        template = 'CASE WHEN %(expression)s IS NULL THEN 1 ELSE 0 END, %(expression)s %(ordering)s'
-    if self.nulls_first:
-        template = 'CASE WHEN %(expression)s IS NULL THEN 0 ELSE 1 END, %(expression)s %(ordering)s'  
+    if self.nulls_last or self.nulls_first:
+        # Only add a NULL flag to the sort key when the native placement is
+        # wrong and the expression can actually be NULL; a plain ordering
+        # can be satisfied by an index scan. DBMaker has no NULLS FIRST/LAST,
+        # so a nullable expression ordered against the native placement still
+        # needs the flag, and that sort can't use an index.
+        if connection.features.nulls_order_largest:
+            native = self.nulls_last != self.descending
+        else:
+            native = self.nulls_first != self.descending
+        if native or not _is_nullable(self.expression, compiler):
+            template = self.template
+        elif self.nulls_last:
+            template = 'CASE WHEN %(expression)s IS NULL THEN 1 ELSE 0 END, %(expression)s %(ordering)s'
+        else:
+            template = 'CASE WHEN %(expression)s IS NULL THEN 0 ELSE 1 END, %(expression)s %(ordering)s'
     return self.as_sql(compiler, connection, template=template)
 
-class SQLCompiler(compiler.SQLCompiler):  
-       
-    def compile(self, node, select_format=False):
-        node = self._as_dbmaker(node)
-        return super().compile(node, select_format)
-
-    def _as_dbmaker(self, node):
-        as_dbmaker = None
-        if isinstance(node, Avg):
-            as_dbmaker = _as_sql_agv
-        elif isinstance(node, OrderBy):
-            as_dbmaker = _as_sql_order_by
-        if as_dbmaker:
-            node = node.copy()
-            node.as_dbmaker = types.MethodType(as_dbmaker, node)
-        return node
+def _as_sql_exact(self, compiler, connection):
+    sql, params = self.as_sql(compiler, connection)
+    if not isinstance(self.lhs, Col) or not self.rhs_is_direct_value() or self.rhs is None:
+        return sql, params
+    digest = digest_field_for(self.lhs.target.model, self.lhs.target.name)
+    if digest is None:
+        return sql, params
+    column = '%s.%s' % (
+        compiler.quote_name_unless_alias(self.lhs.alias),
+        compiler.quote_name_unless_alias(digest.column),
+    )
+    return '(%s = %%s AND %s)' % (column, sql), [text_digest(self.rhs)] + list(params)
+
+def _digest_computable(value):
+    """
+    Return whether the digest of an update value can be computed here.
+    """
+    if isinstance(value, Case):
+        # bulk_update() builds CASE WHEN pk = ... THEN value.
+        return all(isinstance(when.result, Value) for when in value.cases) and _digest_computable(value.default)
+    return isinstance(value, Value) or not hasattr(value, 'resolve_expression')
+
+def _digest_update_value(value):
+    """
+    Return the value to store in a DigestField when its source field is
+    updated to ``value``: the digest when it can be computed here, else NULL
+    for fill_digests() to replace.
+    """
+    if not _digest_computable(value):
+        return None
+    if isinstance(value, Value):
+        return text_digest(value.value)
+    if isinstance(value, Case):
+        return Case(
+            *[When(when.condition, then=Value(text_digest(when.result.value))) for when in value.cases],
+            default=_digest_update_value(value.default),
+        )
+    return text_digest(value)
+
+def _outer_aliases(query):
+    """
+    Return the aliases of outer queries referenced by a subquery.
+    """
+    aliases = set(query.external_aliases)
+    nodes = [query.where]
+    while nodes:
+        node = nodes.pop()
+        nodes.extend(getattr(node, 'children', ()))
+        for side in (getattr(node, 'lhs', None), getattr(node, 'rhs', None)):
+            for expression in side.flatten() if hasattr(side, 'flatten') else ():
+                if isinstance(expression, Col) and expression.alias not in query.alias_map:
+                    aliases.add(expression.alias)
+    return aliases
+
+class DerivedTableJoin:
+    """
+    Query.alias_map entry joining a derived table given as SQL. Only used on
+    queries built by the compiler, so it never takes part in join reuse.
+    """
+    join_type = INNER
+    parent_alias = None
+    join_field = None
+    nullable = False
+    filtered_relation = None
+
+    def __init__(self, table_alias, sql, params):
+        self.table_name = self.table_alias = table_alias
+        self.sql, self.params = sql, params
+
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+    def relabeled_clone(self, change_map):
+        return self
+
+    def equals(self, other, with_filtered_relation):
+        return self is other
+
+# SQLCompiler.compile() dispatches to as_<vendor>() before as_sql(), so these
+# only take effect on DBMaker connections.
+Avg.as_dbmaker = _as_sql_agv
+OrderBy.as_dbmaker = _as_sql_order_by
+Exact.as_dbmaker = _as_sql_exact
+
+class SQLCompiler(compiler.SQLCompiler):
+
+    def as_sql(self, with_limits=True, with_col_aliases=False):
+        """
+        Reuse the SQL generated for an earlier query of the same shape.
+
+        Entries are keyed by a structural fingerprint of everything but the
+        WHERE clause plus the compiled WHERE SQL, and are only stored when
+        all parameters come from the WHERE clause. A hit therefore compiles
+        just the WHERE clause to bind the new parameters.
+        """
+        cache = self.connection.compiled_sql_cache
+        key = self._compiled_sql_key(with_limits, with_col_aliases) if cache is not None else None
+        if key is None:
+            return self._as_sql(with_limits, with_col_aliases)
+        where, having = self.query.where.split_having()
+        if having is not None:
+            return self._as_sql(with_limits, with_col_aliases)
+        where_sql, where_params = self.compile(where)
+        key += (where_sql,)
+        entry = cache.get(key)
+        if entry is not None:
+            cache.move_to_end(key)
+            (sql, self.select, self.klass_info, self.annotation_col_map,
+             self.has_extra_select, self._meta_ordering) = entry
+            self.col_count = len(self.select)
+            self.where, self.having = where, having
+            return sql, tuple(where_params)
+        sql, params = self._as_sql(with_limits, with_col_aliases)
+        if params == tuple(where_params):
+            cache[key] = (
+                sql, self.select, self.klass_info, self.annotation_col_map,
+                self.has_extra_select, self._meta_ordering,
+            )
+            if len(cache) > self.connection.compiled_sql_cache_size:
+                cache.popitem(last=False)
+        return sql, params
+
+    def execute_sql(self, result_type=MULTI, chunked_fetch=False, chunk_size=GET_ITERATOR_CHUNK_SIZE):
+        stats = self.connection.query_stats
+        if stats is None:
+            return super().execute_sql(result_type, chunked_fetch, chunk_size)
+        start = time()
+        result = super().execute_sql(result_type, chunked_fetch, chunk_size)
+        stats.record(self.query, time() - start)
+        return result
+
+    def get_combinator_sql(self, combinator, all):
+        """
+        DBMaker only has UNION. Emulate INTERSECT and EXCEPT by selecting the
+        distinct rows of the first query that do (or don't) have a matching
+        row in every other query. NULLs match each other, as they do in set
+        operations.
+        """
+        if combinator not in ('intersection', 'difference'):
+            return super().get_combinator_sql(combinator, all)
+        qn = self.connection.ops.quote_name
+        parts = []
+        for query in self.query.combined_queries:
+            compiler = query.get_compiler(self.using, self.connection)
+            if not compiler.query.values_select and self.query.values_select:
+                compiler.query.set_values((
+                    *self.query.extra_select,
+                    *self.query.values_select,
+                    *self.query.annotation_select,
+                ))
+            try:
+                if query.is_empty():
+                    raise EmptyResultSet
+                part_sql, part_args = compiler.as_sql(with_col_aliases=True)
+            except EmptyResultSet:
+                # Nothing can be removed by an empty query in a difference.
+                if combinator == 'difference' and parts:
+                    continue
+                raise
+            # Column names given by as_sql(with_col_aliases=True).
+            columns = []
+            col_idx = 1
+            for expression, _, alias in compiler.select:
+                if not alias:
+                    alias, col_idx = 'Col%d' % col_idx, col_idx + 1
+                else:
+                    alias = qn(alias)
+                columns.append((alias, _is_nullable(expression, compiler)))
+            parts.append((part_sql, part_args, columns))
+        first_sql, params, first_columns = parts[0]
+        params = list(params)
+        predicate = 'EXISTS' if combinator == 'intersection' else 'NOT EXISTS'
+        conditions = []
+        for index, (part_sql, part_args, columns) in enumerate(parts[1:], start=1):
+            match = ' AND '.join(
+                ('(C{0}.{1} = C0.{2} OR C{0}.{1} IS NULL AND C0.{2} IS NULL)'
+                 if nullable or first_nullable else 'C{0}.{1} = C0.{2}').format(index, column, first)
+                for (column, nullable), (first, first_nullable) in zip(columns, first_columns)
+            )
+            conditions.append('%s (SELECT 1 FROM (%s) C%d WHERE %s)' % (predicate, part_sql, index, match))
+            params.extend(part_args)
+        result = ['SELECT DISTINCT * FROM (%s) C0' % first_sql]
+        if conditions:
+            result.append('WHERE %s' % ' AND '.join(conditions))
+        return [' '.join(result)], params
+
+    def _as_sql(self, with_limits=True, with_col_aliases=False):
+        """
+        DBMaker rejects LIMIT/OFFSET in a subquery used with IN and similar
+        predicates, but accepts it in a derived table. Wrap uncorrelated
+        sliced subqueries in one so they still run on the server, as well as
+        subqueries flagged with dbmaker_derived_table (see
+        SQLUpdateCompiler.pre_sql_setup()).
+        """
+        lifted = self._lift_grouped_subqueries()
+        if lifted is not None:
+            compiler = lifted.get_compiler(self.using, self.connection)
+            sql, params = compiler._as_sql(with_limits, with_col_aliases)
+            for attr in ('select', 'klass_info', 'annotation_col_map', 'col_count',
+                         'has_extra_select', 'where', 'having', '_meta_ordering'):
+                setattr(self, attr, getattr(compiler, attr))
+            return sql, params
+        query = self.query
+        sliced = with_limits and (query.high_mark is not None or query.low_mark)
+        if sliced and _outer_aliases(query):
+            # Only a derived table makes DBMaker accept the LIMIT, and it
+            # can't see the outer query's columns.
+            raise NotSupportedError(
+                'DBMaker does not support LIMIT/OFFSET in a subquery that '
+                'references the outer query (OuterRef).'
+            )
+        sql, params = super().as_sql(with_limits, with_col_aliases)
+        if (query.subquery and sliced or
+                getattr(query, 'dbmaker_derived_table', False)):
+            sql = 'SELECT * FROM (%s) %s' % (sql, self.connection.ops.quote_name('subquery'))
+        return sql, params
+
+    def _lift_grouped_subqueries(self):
+        """
+        DBMaker can't GROUP BY a subquery. Compute the selected Subquery
+        annotations of a grouped query in a derived table joined on the
+        primary key of the base table, and select and group by its columns
+        instead. Return the rewritten query, or None if nothing is lifted.
+        Only subqueries correlated with the base table alone can be lifted.
+        The derived table only covers the base rows the WHERE clause keeps.
+        """
+        query = self.query
+        if query.group_by is None or query.combinator:
+            return None
+        lifted = [
+            (name, expression) for name, expression in query.annotation_select.items()
+            if isinstance(expression, Subquery) and not expression.contains_aggregate
+        ]
+        if not lifted:
+            return None
+        query = query.clone()
+        base_alias = query.get_initial_alias()
+        lifted = [
+            (name, expression) for name, expression in lifted
+            if _outer_aliases(expression.queryset.query) <= {base_alias}
+        ]
+        if not lifted:
+            return None
+        qn = self.connection.ops.quote_name
+        derived_alias = 'D0'
+        pk = '%s.%s' % (self.quote_name_unless_alias(base_alias), qn(query.get_meta().pk.column))
+        columns, params = ['%s AS %s' % (pk, qn('pk'))], []
+        for index, (name, expression) in enumerate(lifted, start=1):
+            column = qn('sq%d' % index)
+            sub_sql, sub_params = self.compile(expression)
+            columns.append('%s AS %s' % (sub_sql, column))
+            params.extend(sub_params)
+            replacement = RawSQL('%s.%s' % (derived_alias, column), (), expression.output_field)
+            query.annotations[name] = replacement
+            if isinstance(query.group_by, tuple):
+                query.group_by = tuple(
+                    replacement if expr is expression else expr for expr in query.group_by
+                )
+        query._annotation_select_cache = None
+        base_sql, base_params = self.compile(query.alias_map[base_alias])
+        restriction_sql, restriction_params = self._base_restriction(pk)
+        sql = 'INNER JOIN (SELECT %s FROM %s%s) %s ON (%s.%s = %s)' % (
+            ', '.join(columns), base_sql, restriction_sql, derived_alias, derived_alias, qn('pk'), pk,
+        )
+        query.alias_map[derived_alias] = DerivedTableJoin(
+            derived_alias, sql, params + list(base_params) + restriction_params,
+        )
+        query.alias_refcount[derived_alias] = 1
+        return query
+
+    def _base_restriction(self, pk):
+        """
+        Return a WHERE clause limiting the derived table of
+        _lift_grouped_subqueries() to the primary keys ``pk`` of the base
+        rows that the query's WHERE clause (without HAVING) keeps, so the
+        subqueries don't run for rows the query filters out.
+        """
+        restriction = self.query.chain(klass=Query)
+        restriction.where, _ = restriction.where.split_having()
+        if not restriction.where:
+            return '', []
+        restriction.clear_select_clause()
+        restriction.group_by = None
+        restriction.clear_ordering(True)
+        restriction.clear_limits()
+        restriction.add_fields([restriction.get_meta().pk.name])
+        restriction.bump_prefix(self.query)
+        sql, params = restriction.get_compiler(connection=self.connection).as_sql()
+        return ' WHERE %s IN (%s)' % (pk, sql), list(params)
+
+    def _compiled_sql_key(self, with_limits, with_col_aliases):
+        """
+        Return a hashable fingerprint of the parts of the query that shape
+        the generated SQL apart from the WHERE clause, or None if the query
+        can't be cached.
+        """
+        query = self.query
+        if (query.combinator or query.select_for_update or query.explain_query or
+                query._filtered_relations):
+            return None
+        joins = tuple(
+            (alias, type(join), join.table_name, join.join_type,
+             getattr(join, 'parent_alias', None), getattr(join, 'join_field', None),
+             getattr(join, 'nullable', None), query.alias_refcount.get(alias))
+            for alias, join in query.alias_map.items()
+        )
+        try:
+            key = (
+                type(self), query.model, with_limits, with_col_aliases, joins,
+                frozenset(query.external_aliases), query.subquery,
+                getattr(query, 'dbmaker_derived_table', False),
+                query.default_cols, query.default_ordering, query.standard_ordering,
+                query.select, query.values_select, query.group_by,
+                query.order_by, query.extra_order_by, query.extra_tables,
+                query.low_mark, query.high_mark, query.distinct, query.distinct_fields,
+                make_hashable(query.select_related), query.max_depth,
+                make_hashable(query.annotations), make_hashable(query.annotation_select_mask),
+                make_hashable(query.extra_select), make_hashable(query.deferred_loading),
+                # Date functions write the UTC offset into the SQL.
+                timezone.get_current_timezone_name() if settings.USE_TZ else None,
+            )
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def explain_query(self):
+        """
+        DBMaker has no EXPLAIN statement, so compile the query without a
+        prefix and ask the server for the plan of the plain statement.
+        """
+        query = self.query
+        ops = self.connection.ops
+        # Only validates the format and options.
+        ops.explain_query_prefix(query.explain_format, **query.explain_options)
+        query.explain_query = False
+        try:
+            sql, params = self.as_sql()
+        finally:
+            query.explain_query = True
+        with self.connection.cursor() as cursor:
+            plan = ops.fetch_query_plan(cursor, sql, params)
+        yield from ops.format_query_plan(plan, query.explain_format)
 
 class SQLInsertCompiler(compiler.SQLInsertCompiler, SQLCompiler):
-   pass
+    sql_create_stage = "CREATE TEMP TABLE %(stage)s (%(definition)s)"
+    sql_insert_missing = (
+        "INSERT INTO %(table)s (%(columns)s) SELECT %(columns)s FROM %(stage)s S0 "
+        "WHERE NOT EXISTS (SELECT 1 FROM %(table)s T0 WHERE %(conflict)s)"
+    )
+    sql_drop_stage = "DROP TABLE %(stage)s"
+
+    def execute_sql(self, return_id=False):
+        if self.query.ignore_conflicts and self.query.fields:
+            unique_sets = self._unique_field_sets()
+            if unique_sets:
+                self.return_id = False
+                return self._insert_ignoring_conflicts(unique_sets)
+        return super().execute_sql(return_id)
+
+    def _unique_field_sets(self):
+        """
+        Return the unique constraints of the model, as lists of fields, that
+        an inserted row can conflict with.
+        """
+        opts = self.query.get_meta()
+        unique_sets = [[f] for f in self.query.fields if f.unique]
+        unique_sets.extend(
+            [opts.get_field(name) for name in names] for names in opts.unique_together
+        )
+        unique_sets.extend(
+            [opts.get_field(name) for name in constraint.fields]
+            for constraint in opts.constraints
+            if isinstance(constraint, UniqueConstraint) and constraint.condition is None
+        )
+        return [s for s in unique_sets if all(f in self.query.fields for f in s)]
+
+    def _insert_ignoring_conflicts(self, unique_sets):
+        """
+        DBMaker has no INSERT ... ON CONFLICT. Stage the rows in a temporary
+        table and copy over those that don't match an existing row on any
+        unique constraint. Rows repeating a key earlier in the batch are
+        dropped first, so the first one wins.
+        """
+        qn = self.connection.ops.quote_name
+        opts = self.query.get_meta()
+        fields = self.query.fields
+        value_rows = [
+            [self.prepare_value(field, self.pre_save_val(field, obj)) for field in fields]
+            for obj in self.query.objs
+        ]
+        placeholder_rows, param_rows = self.assemble_as_sql(fields, value_rows)
+        # Dedupe on the prepared values; the flattened params don't line up
+        # with fields when a placeholder takes several.
+        index = {f: i for i, f in enumerate(fields)}
+        seen = [set() for _ in unique_sets]
+        rows = []
+        for placeholders, params, values in zip(placeholder_rows, param_rows, value_rows):
+            keys = [make_hashable([values[index[f]] for f in s]) for s in unique_sets]
+            if any(key in keys_seen for key, keys_seen in zip(keys, seen)):
+                continue
+            for key, keys_seen in zip(keys, seen):
+                keys_seen.add(key)
+            rows.append((placeholders, params))
+
+        stage = qn(truncate_name('%s_stage' % opts.db_table, self.connection.ops.max_name_length()))
+        columns = ', '.join(qn(f.column) for f in fields)
+        conflict = ' OR '.join(
+            '(%s)' % ' AND '.join(
+                ('(T0.{0} = S0.{0} OR T0.{0} IS NULL AND S0.{0} IS NULL)' if f.null else
+                 'T0.{0} = S0.{0}').format(qn(f.column))
+                for f in unique_set
+            )
+            for unique_set in unique_sets
+        )
+        with self.connection.cursor() as cursor:
+            cursor.execute(self.sql_create_stage % {
+                'stage': stage,
+                'definition': ', '.join(
+                    '%s %s' % (qn(f.column), f.rel_db_type(self.connection)) for f in fields
+                ),
+            })
+            try:
+                insert_sql = 'INSERT INTO %s (%s) VALUES (%%s)' % (stage, columns)
+                if all(p == '%s' for placeholders, _ in rows for p in placeholders):
+                    cursor.executemany(insert_sql % ', '.join(['%s'] * len(fields)),
+                                       [params for _, params in rows])
+                else:
+                    for placeholders, params in rows:
+                        cursor.execute(insert_sql % ', '.join(placeholders), params)
+                cursor.execute(self.sql_insert_missing % {
+                    'table': qn(opts.db_table),
+                    'columns': columns,
+                    'stage': stage,
+                    'conflict': conflict,
+                })
+            finally:
+                cursor.execute(self.sql_drop_stage % {'stage': stage})
 
 class SQLDeleteCompiler(compiler.SQLDeleteCompiler, SQLCompiler):
     pass
 
 class SQLUpdateCompiler(compiler.SQLUpdateCompiler, SQLCompiler):
-    pass
+
+    def pre_sql_setup(self):
+        """
+        Restrict updates filtering on other tables with a primary key
+        subquery instead of selecting the keys into Python first. DBMaker
+        doesn't allow selecting from the table being updated, so the
+        subquery goes through a derived table. Related updates still need
+        the keys and keep the default behavior.
+        """
+        self._add_digest_updates()
+        if self.query.related_updates:
+            return super().pre_sql_setup()
+        refcounts_before = self.query.alias_refcount.copy()
+        # Ensure base table is in the query
+        self.query.get_initial_alias()
+        if self.query.count_active_tables() == 1:
+            return
+        query = self.query.chain(klass=Query)
+        query.select_related = False
+        query.clear_ordering(True)
+        query._extra = {}
+        query.select = []
+        query.add_fields([query.get_meta().pk.name])
+        query.dbmaker_derived_table = True
+        super(compiler.SQLUpdateCompiler, self).pre_sql_setup()
+        self.query.where = self.query.where_class()
+        self.query.add_filter(('pk__in', query))
+        self.query.reset_refcounts(refcounts_before)
+
+    def execute_sql(self, result_type):
+        """
+        Fill the digests an update from expressions left NULL, in the same
+        transaction, so digest lookups never miss its rows.
+        """
+        unfilled = [
+            (model, digest) for field, model, value in self.query.values
+            for digest in [digest_field_for(field.model, field.name)]
+            if digest is not None and not _digest_computable(value)
+        ]
+        if not unfilled:
+            return super().execute_sql(result_type)
+        with transaction.atomic(using=self.using, savepoint=False):
+            result = super().execute_sql(result_type)
+            for model, digest in unfilled:
+                fill_digests(self.connection, model, digest)
+        return result
+
+    def _add_digest_updates(self):
+        """
+        Keep DigestFields in step with the source fields this update sets.
+        """
+        updated = {field for field, _, _ in self.query.values}
+        for field, model, value in list(self.query.values):
+            digest = digest_field_for(field.model, field.name)
+            if digest is not None and digest not in updated:
+                self.query.values.append((digest, model, _digest_update_value(value)))
+                updated.add(digest)
 
 class SQLAggregateCompiler(compiler.SQLAggregateCompiler, SQLCompiler):
     pass
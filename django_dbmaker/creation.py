@@ -39,11 +39,22 @@
 # ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
 # SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+import hashlib
 import subprocess
 import os
+import pickle
+import sys
+
+from django.apps import apps
+from django.conf import settings
 from django.db.backends.base.creation import BaseDatabaseCreation
 
 class DatabaseCreation(BaseDatabaseCreation):
+    # DDL recorded by create_test_db(), and the export built from it for
+    # _clone_test_db().
+    test_db_ddl = None
+    _test_db_export = None
+
     # This dictionary maps Field objects to their associated MS SQL column
     # types, as strings. Column-type strings can contain format strings; they'll
     # be interpolated against the values of Field.__dict__ before being output.
@@ -114,47 +125,230 @@ class DatabaseCreation(BaseDatabaseCreation):
             sys.exit(2)    
         
     """
+    def create_test_db(self, verbosity=1, autoclobber=False, serialize=True, keepdb=False):
+        template = None if keepdb else self._test_db_template_path()
+        if template is not None and os.path.exists(template):
+            return self._create_test_db_from_template(template, verbosity, autoclobber, serialize)
+        # Record the DDL that migrate runs, so clones can replay it instead
+        # of migrating again.
+        self.connection.ddl_log = []
+        try:
+            test_database_name = super(DatabaseCreation, self).create_test_db(
+                verbosity, autoclobber, serialize, keepdb)
+        finally:
+            self.test_db_ddl = self.connection.ddl_log
+            self.connection.ddl_log = None
+            self._test_db_export = None
+        if template is not None:
+            self._save_test_db_template(template)
+        return test_database_name
+
+    def _test_db_template_path(self):
+        """
+        Return the path of the template for the current migrations under
+        OPTIONS['test_template_dir'], or None if templates aren't used.
+        """
+        directory = self.connection.settings_dict['OPTIONS'].get('test_template_dir')
+        if not directory:
+            return None
+        return os.path.join(directory, '%s-%s.pickle' % (self.connection.alias, self._migration_graph_hash()))
+
+    def _migration_graph_hash(self):
+        """
+        Hash what the migrated schema depends on: the migration files, the
+        models of apps without migrations, and the backend options that
+        change the DDL.
+        """
+        from django.db.migrations.loader import MigrationLoader
+
+        loader = MigrationLoader(None, ignore_no_migrations=True)
+        digest = hashlib.sha1()
+        for key in sorted(loader.graph.nodes):
+            digest.update(repr(key).encode())
+            module = sys.modules.get(loader.graph.nodes[key].__module__)
+            path = getattr(module, '__file__', None)
+            if path and os.path.exists(path):
+                with open(path, 'rb') as f:
+                    digest.update(f.read())
+        for app_label in sorted(loader.unmigrated_apps):
+            try:
+                app_config = apps.get_app_config(app_label)
+            except LookupError:
+                continue
+            for model in app_config.get_models():
+                digest.update(repr((
+                    model._meta.db_table,
+                    [(field.column, field.db_type(self.connection)) for field in model._meta.local_fields],
+                )).encode())
+        options = self.connection.settings_dict['OPTIONS']
+        digest.update(repr(sorted(
+            (name, repr(options.get(name))) for name in ('compact_types', 'table_storage')
+        )).encode())
+        digest.update(repr(sorted(settings.CACHES.items())).encode())
+        return digest.hexdigest()
+
+    def _save_test_db_template(self, template):
+        """
+        Store the export of the test database as ``template`` and remove the
+        templates of earlier migration states.
+        """
+        try:
+            export = self._export_test_db()
+        except RuntimeError:
+            return
+        directory = os.path.dirname(template)
+        os.makedirs(directory, exist_ok=True)
+        prefix = '%s-' % self.connection.alias
+        for name in os.listdir(directory):
+            if name.startswith(prefix) and name.endswith('.pickle'):
+                os.remove(os.path.join(directory, name))
+        # Written aside and renamed, so other test runs never read half a file.
+        partial = '%s.%d' % (template, os.getpid())
+        with open(partial, 'wb') as f:
+            pickle.dump(export, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(partial, template)
+
+    def _create_test_db_from_template(self, template, verbosity, autoclobber, serialize):
+        """
+        create_test_db() without migrate: the schema and rows are restored
+        from a template saved by an earlier run with the same migrations.
+        """
+        from django.core.management import call_command
+
+        test_database_name = self._get_test_db_name()
+        if verbosity >= 1:
+            self.log('Creating test database for alias %s from template %s...' % (
+                self._get_database_display_str(verbosity, test_database_name), template,
+            ))
+        self._create_test_db(verbosity, autoclobber)
+
+        self.connection.close()
+        settings.DATABASES[self.connection.alias]["NAME"] = test_database_name
+        self.connection.settings_dict["NAME"] = test_database_name
+
+        with open(template, 'rb') as f:
+            self._test_db_export = pickle.load(f)
+        self.test_db_ddl = self._test_db_export[0]
+        self._drop_tables(self.connection)
+        self._clone_db(self.connection)
+
+        if serialize:
+            self.connection._test_serialized_contents = self.serialize_db_to_string()
+        # The cache tables usually come with the template; any that don't
+        # are created as create_test_db() does, and their DDL is kept for the
+        # clones.
+        self.connection.ddl_log = self.test_db_ddl
+        try:
+            call_command('createcachetable', database=self.connection.alias)
+        finally:
+            self.connection.ddl_log = None
+        self.connection.ensure_connection()
+        return test_database_name
+
+    def _database_connection(self, database_name):
+        """
+        Return a new connection to the database named ``database_name``,
+        with the settings of this one.
+        """
+        settings_dict = dict(self.connection.settings_dict, NAME=database_name)
+        return self.connection.__class__(settings_dict, alias=self.connection.alias)
+
+    def _drop_tables(self, connection):
+        """
+        Drop the views and tables of ``connection``'s database. DBMaker
+        databases can't be dropped over SQL, so this is what destroying one
+        amounts to. Other catalog entries (system tables, synonyms) are left
+        alone.
+        """
+        qn = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute("CALL SETSYSTEMOPTION('FKCHK', '0')")
+            try:
+                tables = [
+                    info for info in connection.introspection.get_table_list(cursor)
+                    if info.type in ('t', 'v')
+                ]
+                for info in sorted(tables, key=lambda info: info.type != 'v'):
+                    cursor.execute('DROP %s %s' % ('VIEW' if info.type == 'v' else 'TABLE', qn(info.name)))
+            finally:
+                cursor.execute("CALL SETSYSTEMOPTION('FKCHK', '1')")
+
     def _destroy_test_db(self, test_database_name, verbosity):
         "Internal implementation - remove the test db tables."
         if test_database_name:
-            # Remove the SQLite database file
-            os.remove(test_database_name)
+            connection = self._database_connection(test_database_name)
+            try:
+                self._drop_tables(connection)
+            finally:
+                connection.close()
 
     def _clone_test_db(self, suffix, verbosity, keepdb=False):
-        source_database_name = self.connection.settings_dict['NAME']
+        """
+        Copy the test database into the one named by the clone settings for
+        ``suffix``, which must exist already. The schema is rebuilt by
+        replaying the DDL recorded while the test database was migrated and
+        the rows are copied over; nothing is migrated again.
+        """
         target_database_name = self.get_test_db_clone_settings(suffix)['NAME']
-        test_db_params = {
-            'dbname': self.connection.ops.quote_name(target_database_name),
-            'suffix': self.sql_table_creation_suffix(),
-        }
-        with self._nodb_connection.cursor() as cursor:
+        target = self._database_connection(target_database_name)
+        try:
+            with target.cursor() as cursor:
+                existing = target.introspection.table_names(cursor)
+            if keepdb and existing:
+                return
+            if existing:
+                if verbosity >= 1:
+                    self.log('Destroying old test database for alias %s...' % (
+                        self._get_database_display_str(verbosity, target_database_name),
+                    ))
+                self._drop_tables(target)
+            self._clone_db(target)
+        except Exception as e:
+            self.log('Got an error cloning the test database: %s' % e)
+            sys.exit(2)
+        finally:
+            target.close()
+
+    def _export_test_db(self):
+        """
+        Return (ddl, tables) for the test database: the recorded DDL as
+        (sql, params) pairs, and (table, columns, rows) for every table.
+        Read once and shared by all the clones.
+        """
+        if self._test_db_export is None:
+            ddl = self.test_db_ddl
+            if not ddl:
+                raise RuntimeError(
+                    'no DDL was recorded while creating the test database '
+                    '(was it kept with --keepdb?); run once without --keepdb.'
+                )
+            qn = self.connection.ops.quote_name
+            tables = []
+            with self.connection.cursor() as cursor:
+                for table in self.connection.introspection.table_names(cursor):
+                    # Through pyodbc directly, so values come back as stored.
+                    cursor.cursor.execute('SELECT * FROM %s' % qn(table))
+                    columns = [column[0] for column in cursor.cursor.description]
+                    rows = [tuple(row) for row in cursor.cursor.fetchall()]
+                    tables.append((table, columns, rows))
+            self._test_db_export = (ddl, tables)
+        return self._test_db_export
+
+    def _clone_db(self, target):
+        ddl, tables = self._export_test_db()
+        qn = target.ops.quote_name
+        with target.cursor() as cursor:
+            for sql, params in ddl:
+                cursor.execute(sql, params)
+            cursor.execute("CALL SETSYSTEMOPTION('FKCHK', '0')")
             try:
-                self._execute_create_test_db(cursor, test_db_params, keepdb)
-            except Exception:
-                if keepdb:
-                    # If the database should be kept, skip everything else.
-                    return
-                try:
-                    if verbosity >= 1:
-                        self.log('Destroying old test database for alias %s...' % (
-                            self._get_database_display_str(verbosity, target_database_name),
-                        ))
-                    self._destroy_test_db(test_db_params)
-                    self._execute_create_test_db(cursor, test_db_params, keepdb)
-                except Exception as e:
-                    self.log('Got an error recreating the test database: %s' % e)
-                    sys.exit(2)
-        self._clone_db(source_database_name, target_database_name)
-
-    def _clone_db(self, source_database_name, target_database_name):
-        dump_args = DatabaseClient.settings_to_cmd_args(self.connection.settings_dict)[1:]
-        dump_args[-1] = source_database_name
-        dump_cmd = ['mysqldump', '--routines', '--events'] + dump_args
-        load_cmd = DatabaseClient.settings_to_cmd_args(self.connection.settings_dict)
-        load_cmd[-1] = target_database_name
-
-        with subprocess.Popen(dump_cmd, stdout=subprocess.PIPE) as dump_proc:
-            with subprocess.Popen(load_cmd, stdin=dump_proc.stdout, stdout=subprocess.DEVNULL):
-                # Allow dump_proc to receive a SIGPIPE if the load process exits.
-                dump_proc.stdout.close()
-            
\ No newline at end of file
+                for table, columns, rows in tables:
+                    if not rows:
+                        continue
+                    # Explicit SERIAL values move the table's counter past them.
+                    cursor.cursor.executemany('INSERT INTO %s (%s) VALUES (%s)' % (
+                        qn(table), ', '.join(qn(column) for column in columns),
+                        ', '.join('?' * len(columns)),
+                    ), rows)
+            finally:
+                cursor.execute("CALL SETSYSTEMOPTION('FKCHK', '1')")
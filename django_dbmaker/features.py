@@ -4,16 +4,16 @@ class DatabaseFeatures(BaseDatabaseFeatures):
     can_use_chunked_reads = False
     supports_microsecond_precision = False
     supports_regex_backreferencing = False
-    supports_subqueries_in_group_by = False
+    supports_subqueries_in_group_by = True
     supports_transactions = True
-    allow_sliced_subqueries = False
+    allow_sliced_subqueries = True
     supports_paramstyle_pyformat = False
 
     has_bulk_insert = False
     # DateTimeField doesn't support timezones, only DateTimeOffsetField
     has_zoneinfo_database = False
     supports_timezones = False
-    supports_sequence_reset = False
+    supports_sequence_reset = True
     supports_tablespaces = True
     ignores_nulls_in_unique_constraints = False
     can_introspect_autofield = True
@@ -23,13 +23,15 @@ class DatabaseFeatures(BaseDatabaseFeatures):
     can_introspect_small_integer_field = True
     supports_index_on_text_field = False
     implied_column_null = True
-    supports_select_intersection = False
-    supports_select_difference = False
-    update_can_self_select = False
+    supports_select_intersection = True
+    supports_select_difference = True
+    update_can_self_select = True
     has_zoneinfo_database = False
-    supports_ignore_conflicts = False
-    allow_sliced_subqueries_with_in = False
+    supports_ignore_conflicts = True
+    allow_sliced_subqueries_with_in = True
     nulls_order_largest = True
+    supports_explaining_query_execution = True
+    supported_explain_formats = {'JSON', 'TEXT'}
     #order_by_nulls_first = True
     # Does the backend support NULLS FIRST and NULLS LAST in ORDER BY?
     #supports_order_by_nulls_modifier = False
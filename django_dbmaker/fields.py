@@ -0,0 +1,133 @@
+"""
+Model fields for DBMaker.
+
+AsciiCharField is a CharField stored as varchar rather than nvarchar, for
+text known to be ASCII. BinaryUUIDField is a UUIDField stored as binary(16)
+rather than char(32); altering a UUIDField into one (or back) converts the
+column's values.
+
+DBMaker can't index TextField (nclob) columns, and long nvarchar keys make
+poor indexes. A DigestField keeps an indexed MD5 digest of another text field
+of the same model; on DBMaker, ``exact`` lookups on that field are compiled to
+probe the digest index first:
+
+    class Page(models.Model):
+        url = models.TextField()
+        url_digest = DigestField(source='url')
+
+Digests are set on save() and bulk_create(), and by QuerySet.update() or
+bulk_update() with plain values. After updates from expressions (e.g. F()),
+which the database can't digest, fill_digests() computes the missing ones
+in the same transaction. Adding a DigestField to a table fills it as well,
+so lookups can rely on every non-NULL source having its digest.
+"""
+import hashlib
+import uuid
+
+from django.core.validators import RegexValidator
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+def text_digest(value):
+    """
+    Return the hex MD5 digest stored by DigestField for ``value``.
+    """
+    if value is None:
+        return None
+    return hashlib.md5(str(value).encode('utf-8')).hexdigest()
+
+
+class AsciiCharField(models.CharField):
+    description = _("String of ASCII characters (up to %(max_length)s)")
+    default_validators = [RegexValidator(r'^[\x00-\x7f]*\Z', _('Enter ASCII characters only.'))]
+
+    def db_type(self, connection):
+        if connection.vendor == 'dbmaker':
+            return 'varchar(%s)' % self.max_length
+        return super().db_type(connection)
+
+
+class BinaryUUIDField(models.UUIDField):
+    description = _("Universally unique identifier stored as bytes")
+
+    def db_type(self, connection):
+        if connection.vendor == 'dbmaker':
+            return 'binary(16)'
+        return super().db_type(connection)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if connection.vendor != 'dbmaker' or value is None:
+            return super().get_db_prep_value(value, connection, prepared)
+        if not isinstance(value, uuid.UUID):
+            value = self.to_python(value)
+        return value.bytes
+
+
+class DigestField(models.CharField):
+    description = "MD5 digest of another field"
+
+    _defaults = {'max_length': 32, 'db_index': True, 'null': True, 'editable': False}
+
+    def __init__(self, source, *args, **kwargs):
+        self.source = source
+        for name, value in self._defaults.items():
+            kwargs.setdefault(name, value)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        for option, default in self._defaults.items():
+            if getattr(self, option) == default:
+                kwargs.pop(option, None)
+            else:
+                kwargs[option] = getattr(self, option)
+        kwargs['source'] = self.source
+        return name, 'django_dbmaker.fields.DigestField', args, kwargs
+
+    def pre_save(self, model_instance, add):
+        source = model_instance._meta.get_field(self.source)
+        value = text_digest(getattr(model_instance, source.attname))
+        setattr(model_instance, self.attname, value)
+        return value
+
+
+def digest_field_for(model, field_name):
+    """
+    Return the DigestField kept for ``model.field_name``, or None. The
+    mapping is cached on the model's Options, so it goes away with the model
+    (migrations create many short-lived historical models).
+    """
+    opts = model._meta
+    try:
+        digests = opts._dbmaker_digest_fields
+    except AttributeError:
+        digests = opts._dbmaker_digest_fields = {
+            field.source: field for field in opts.concrete_fields if isinstance(field, DigestField)
+        }
+    return digests.get(field_name)
+
+
+def fill_digests(connection, model, field, batch_size=1000):
+    """
+    Compute the DigestField ``field`` of the rows of ``model`` where it is
+    NULL but its source isn't, batch_size rows at a time.
+    """
+    qn = connection.ops.quote_name
+    names = {
+        'table': qn(model._meta.db_table),
+        'pk': qn(model._meta.pk.column),
+        'source': qn(model._meta.get_field(field.source).column),
+        'digest': qn(field.column),
+    }
+    select_sql = "SELECT %(pk)s, %(source)s FROM %(table)s WHERE %(pk)s IN (%%s)" % names
+    update_sql = "UPDATE %(table)s SET %(digest)s = %%s WHERE %(pk)s = %%s" % names
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT %(pk)s FROM %(table)s WHERE %(digest)s IS NULL AND %(source)s IS NOT NULL" % names
+        )
+        pks = [pk for pk, in cursor.fetchall()]
+        for start in range(0, len(pks), batch_size):
+            batch = pks[start:start + batch_size]
+            cursor.execute(select_sql % ', '.join(['%s'] * len(batch)), batch)
+            cursor.executemany(update_sql, [(text_digest(value), pk) for pk, value in cursor.fetchall()])
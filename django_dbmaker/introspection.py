@@ -40,15 +40,61 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
 # SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import re
+from collections import defaultdict
+
 import pyodbc as Database
+from django.db import models
 from django.db.backends.base.introspection import (
     BaseDatabaseIntrospection, FieldInfo, TableInfo,
 )
-import sqlparse
 from django.utils.datastructures import OrderedSet
 SQL_AUTOFIELD = -777555
 SQL_BIGAUTOFIELD = -777444
 
+# The table a DDL statement works on, and whether it may add, drop or rename
+# a table (which changes the table list as well).
+_ddl_table_re = re.compile(
+    r'^\s*(?:(CREATE|DROP)\s+(?:TEMP\s+)?TABLE'
+    r'|ALTER\s+TABLE'
+    r'|CREATE\s+(?:UNIQUE\s+)?INDEX\s+\S+\s+ON'
+    r'|DROP\s+INDEX\s+\S+\s+FROM)\s+("[^"]+"|\S+)',
+    re.IGNORECASE,
+)
+
+# Tokens of a check constraint that matter for finding the columns it uses.
+# Anything not matched (operators, whitespace) is skipped by finditer().
+_constraint_token_re = re.compile(r"""
+    '(?:[^']|'')*'              # string literal
+  | "(?P<quoted>[^"]*)"         # quoted identifier
+  | \d[\w.]*                    # number
+  | (?P<word>[^\W\d]\w*)         # identifier or keyword
+  | (?P<punct>[(),])
+""", re.VERBOSE)
+
+
+class SchemaSnapshot(object):
+    """
+    Catalog rows for every table of the database, loaded with one query per
+    catalog table. Tables changed by DDL are forgotten and read from the
+    catalog again by the introspection methods.
+    """
+    def __init__(self):
+        self.tables = None
+        self.known = set()
+        self.columns = defaultdict(list)
+        self.auto_fields = defaultdict(dict)
+        self.foreign_keys = defaultdict(list)
+        self.column_checks = defaultdict(list)
+        self.table_checks = defaultdict(list)
+        # SHOWINDEX only works per table, so indexes are cached on first use.
+        self.indexes = {}
+
+    def forget(self, table_name):
+        self.known.discard(table_name)
+        self.indexes.pop(table_name, None)
+
+
 class DatabaseIntrospection(BaseDatabaseIntrospection):
     # Map type codes to Django Field types.
     data_types_reverse = {
@@ -79,26 +125,131 @@ class DatabaseIntrospection(BaseDatabaseIntrospection):
         Database.SQL_WVARCHAR:          'CharField',
     }
 
+    def __init__(self, connection):
+        super().__init__(connection)
+        # Column names in ordinal order, keyed by table. Filled by colname()
+        # and get_table_description() and dropped at the start of each
+        # introspection pass (get_table_list()) or when DDL is executed.
+        self._column_names = {}
+        self._snapshot = None
+
+    def clear_column_cache(self):
+        self._column_names.clear()
+
     def get_table_list(self, cursor):
         """
         Returns a list of table names in the current database.
         """
+        self.clear_column_cache()
+        if self._snapshot is None and self.connection.settings_dict['OPTIONS'].get('schema_snapshot', False):
+            self.load_schema_snapshot(cursor)
+        if self._snapshot is not None and self._snapshot.tables is not None:
+            return list(self._snapshot.tables)
+        cursor.execute("SELECT trim(TABLE_NAME), trim(TABLE_TYPE) FROM INFORMATION_SCHEMA.TABLES")
+        types = {'TABLE': 't', 'VIEW': 'v'}
+        tables = [TableInfo(self.identifier_converter(row[0]), types.get(row[1])) for row in cursor.fetchall()]
+        if self._snapshot is not None:
+            self._snapshot.tables = tables
+        return list(tables)
+
+    def load_schema_snapshot(self, cursor):
+        """
+        Read the tables, columns, SERIAL columns, foreign keys and check
+        constraints of the whole database and serve introspection calls from
+        them until DDL touches a table or the connection is closed.
+        """
+        self._snapshot = None
+        snapshot = SchemaSnapshot()
+        convert = self.identifier_converter
         cursor.execute("SELECT trim(TABLE_NAME), trim(TABLE_TYPE) FROM INFORMATION_SCHEMA.TABLES")
         types = {'TABLE': 't', 'VIEW': 'v'}
-        return [TableInfo(self.identifier_converter(row[0]), types.get(row[1])) for row in cursor.fetchall()]
+        snapshot.tables = [TableInfo(convert(row[0]), types.get(row[1])) for row in cursor.fetchall()]
+        snapshot.known.update(table.name for table in snapshot.tables)
+        for row in cursor.columns():
+            snapshot.columns[convert(row[2])].append(row)
+        cursor.execute("SELECT TRIM(TABLE_NAME), TRIM(COLUMN_NAME), TRIM(TYPE_NAME) FROM SYSCOLUMN WHERE TYPE_NAME IN ('SERIAL', 'BIGSERIAL')")
+        for table_name, column_name, type_name in cursor.fetchall():
+            snapshot.auto_fields[convert(table_name)][convert(column_name)] = (
+                SQL_BIGAUTOFIELD if type_name.upper() == 'BIGSERIAL' else SQL_AUTOFIELD
+            )
+        cursor.execute("SELECT TRIM(FK_TBL_NAME), FK_NAME, FK_COL_ORDER, TRIM(PK_TBL_NAME), PK_COL_ORDER FROM SYSTEM.SYSFOREIGNKEY")
+        for row in cursor.fetchall():
+            snapshot.foreign_keys[convert(row[0])].append(tuple(row[1:]))
+        cursor.execute("SELECT TRIM(TABLE_NAME), CONSTR, COLUMN_NAME FROM SYSTEM.SYSCOLUMN WHERE BLOBLEN(CONSTR)>0")
+        for row in cursor.fetchall():
+            snapshot.column_checks[convert(row[0])].append(tuple(row[1:]))
+        cursor.execute("SELECT TRIM(TABLE_NAME), CONSTR FROM SYSTEM.SYSTABLE WHERE BLOBLEN(CONSTR)>0")
+        for row in cursor.fetchall():
+            snapshot.table_checks[convert(row[0])].append(tuple(row[1:]))
+        self._snapshot = snapshot
+        return snapshot
+
+    def invalidate_schema_snapshot(self, sql=None):
+        """
+        Forget what the statement ``sql`` may have changed, or everything
+        when no statement is given or its target can't be told. Statements
+        that don't change the schema (see DatabaseWrapper.is_schema_change())
+        are ignored.
+        """
+        if sql is not None and not self.connection.is_schema_change(sql):
+            return
+        self.clear_column_cache()
+        if self._snapshot is None or sql is None:
+            self._snapshot = None
+            return
+        match = _ddl_table_re.match(sql)
+        if match is None:
+            self._snapshot = None
+            return
+        create_or_drop, table_name = match.groups()
+        if create_or_drop or re.search(r'\bRENAME\b', sql, re.IGNORECASE):
+            self._snapshot.tables = None
+        self._snapshot.forget(self.identifier_converter(table_name.strip('"')))
+
+    def prefetch_indexes(self, table_names, jobs):
+        """
+        Read the indexes of the given tables into the loaded snapshot, spread
+        over ``jobs`` extra connections used from worker threads.
+        """
+        table_names = sorted(table_names)
+        chunks = [table_names[i::jobs] for i in range(jobs) if table_names[i::jobs]]
+
+        def fetch(cursor, chunk):
+            return [(table_name, self._fetch_indexes(cursor, table_name)) for table_name in chunk]
+
+        for results in self.connection.map_on_copies(fetch, chunks):
+            for table_name, indexes in results:
+                self._snapshot.indexes[self.identifier_converter(table_name)] = indexes
+
+    def _snapshot_of(self, table_name):
+        """
+        Return the snapshot when it holds the table's catalog rows, None when
+        they have to be queried.
+        """
+        if self._snapshot is not None and self.identifier_converter(table_name) in self._snapshot.known:
+            return self._snapshot
+        return None
 
     def _is_auto_field(self, cursor, table_name, column_name):
         """
         Checks whether column is Identity
         """
-        # COLUMNPROPERTY: http://msdn2.microsoft.com/en-us/library/ms174968.aspx
+        return column_name in self._get_auto_fields(cursor, table_name)
 
-        #from django.db import connection
-        #cursor.execute("SELECT COLUMNPROPERTY(OBJECT_ID(%s), %s, 'IsIdentity')",
-        #                 (connection.ops.quote_name(table_name), column_name))
-        cursor.execute("SELECT COUNT(*) FROM SYSCOLUMN WHERE TABLE_NAME = UPPER(%s) AND COLUMN_NAME=UPPER(%s) AND (TYPE_NAME='SERIAL' OR TYPE_NAME='BIGSERAL')",
-                         (self.connection.ops.quote_name(table_name), column_name))
-        return cursor.fetchall()[0][0]
+    def _get_auto_fields(self, cursor, table_name):
+        """
+        Return a dict mapping the SERIAL and BIGSERIAL columns of the table to
+        the matching custom type code, in a single catalog query.
+        """
+        snapshot = self._snapshot_of(table_name)
+        if snapshot is not None:
+            return dict(snapshot.auto_fields[self.identifier_converter(table_name)])
+        cursor.execute("SELECT TRIM(COLUMN_NAME), TRIM(TYPE_NAME) FROM SYSCOLUMN WHERE TABLE_NAME = UPPER(%s) AND TYPE_NAME IN ('SERIAL', 'BIGSERIAL')",
+                         (table_name,))
+        return {
+            self.identifier_converter(column_name): SQL_BIGAUTOFIELD if type_name.upper() == 'BIGSERIAL' else SQL_AUTOFIELD
+            for column_name, type_name in cursor.fetchall()
+        }
 
     def get_table_description(self, cursor, table_name, identity_check=True):
         """Returns a description of the table, with DB-API cursor.description interface.
@@ -112,23 +263,51 @@ class DatabaseIntrospection(BaseDatabaseIntrospection):
         """
 
         # map pyodbc's cursor.columns to db-api cursor description
-        columns = [[c[3], c[4], None, c[6], c[6], c[8], c[10], c[12]] for c in cursor.columns(table=table_name)]
+        columns = [[c[3], c[4], None, c[6], c[6], c[8], c[10], c[12]] for c in self._column_rows(cursor, table_name)]
+        auto_fields = self._get_auto_fields(cursor, table_name) if identity_check else {}
         items = []
         for column in columns:
             column[0] = self.identifier_converter(column[0])
-            if identity_check and self._is_auto_field(cursor, table_name, column[0]):
-                column[1] = SQL_AUTOFIELD
+            column[1] = auto_fields.get(column[0], column[1])
             items.append(FieldInfo(*column))
-            
+        self._column_names[self.identifier_converter(table_name)] = [item.name for item in items]
         return items  
     
     def identifier_converter(self, name):
         """Identifier comparison is case insensitive under Oracle."""
         return name.lower()
     
-    def colname(self, cursor, table_name): 
-        colnames = [self.identifier_converter(c[3]) for c in cursor.columns(table=table_name)]
-        return colnames
+    def colname(self, cursor, table_name):
+        """
+        Return the table's column names in ordinal order, fetching them from
+        the catalog only the first time the table is seen in this pass.
+        """
+        key = self.identifier_converter(table_name)
+        if key not in self._column_names:
+            self._column_names[key] = [self.identifier_converter(c[3]) for c in self._column_rows(cursor, table_name)]
+        return self._column_names[key]
+
+    def _column_rows(self, cursor, table_name):
+        snapshot = self._snapshot_of(table_name)
+        if snapshot is not None:
+            return snapshot.columns[self.identifier_converter(table_name)]
+        return cursor.columns(table=table_name)
+
+    def _foreign_key_rows(self, cursor, table_name):
+        """
+        Return (name, fk_col_order, referenced_table, pk_col_order) for each
+        foreign key of the table.
+        """
+        snapshot = self._snapshot_of(table_name)
+        if snapshot is not None:
+            return snapshot.foreign_keys[self.identifier_converter(table_name)]
+        query = """
+            SELECT fk_name, fk_col_order, TRIM(pk_tbl_name), pk_col_order
+            FROM system.sysforeignkey
+            WHERE fk_tbl_name = upper(%s)
+        """
+        cursor.execute(query, [table_name])
+        return cursor.fetchall()
                 
     def _bytes_to_list(self, bytes):
         
@@ -143,6 +322,10 @@ class DatabaseIntrospection(BaseDatabaseIntrospection):
             columnid= int.from_bytes(bytes[i*2:(i+1)*2], byteorder='little', signed=False)-1
         return item
           
+    def _fetch_indexes(self, cursor, table_name):
+        cursor.execute("call SHOWINDEX('sysadm', '%s')" % table_name)
+        return [tuple(x[1:8]) for x in cursor.fetchall()]
+
     def get_relations(self, cursor, table_name):
         """
         Return a dictionary of {field_name: (field_name_other_table, other_table)}
@@ -169,23 +352,17 @@ class DatabaseIntrospection(BaseDatabaseIntrospection):
         Backends can override this to return a list of (column_name, referenced_table_name,
         referenced_column_name) for all key columns in given table.
         """
-        sql = """
-SELECT 
-  PK_COL_ORDER,
-  TRIM(PK_TBL_NAME) AS referenced_table_name,
-  FK_COL_ORDER
-FROM SYSTEM.SYSFOREIGNKEY 
-WHERE FK_TBL_NAME = Upper(%s) """
-        cursor.execute(sql, (table_name,))
-        foreignKeyInfo = cursor.fetchall()
+        foreignKeyInfo = self._foreign_key_rows(cursor, table_name)
         foreignKeys = []
+        fkcolnames = self.colname(cursor, table_name)
 
-        for pk_col_order, referenced_table_name, fk_col_order in foreignKeyInfo:
+        for _, fk_col_order, referenced_table_name, pk_col_order in foreignKeyInfo:
             pkcolIndex = self._bytes_to_list(pk_col_order)
             fkcolIndex = self._bytes_to_list(fk_col_order)
+            pkcolnames = self.colname(cursor, referenced_table_name)
             i = 0
             while (i<len(pkcolIndex)):
-                foreignKeys.append((self.colname(cursor, table_name)[fkcolIndex[i]], self.identifier_converter(referenced_table_name), self.colname(cursor, referenced_table_name)[pkcolIndex[i]]))
+                foreignKeys.append((fkcolnames[fkcolIndex[i]], self.identifier_converter(referenced_table_name), pkcolnames[pkcolIndex[i]]))
                 i += 1
             
         return foreignKeys;
@@ -193,32 +370,29 @@ WHERE FK_TBL_NAME = Upper(%s) """
     def get_sequences(self, cursor, table_name, table_fields=()):
         for f in table_fields:
             if isinstance(f, models.AutoField):
-                return [{'table': table_name, 'column': f.column}]
+                return [{'table': table_name, 'column': f.column, 'type': f.db_type(self.connection)}]
         return []
     
     def _parse_column_constraint(self, sql, columns):
-        statement = sqlparse.parse(sql)[0]
-        tokens = (token for token in statement.flatten() if not token.is_whitespace)
         braces_deep = 0
         check_columns=[]
-        for token in tokens:
-            if token.match(sqlparse.tokens.Punctuation, '('):
+        for token in _constraint_token_re.finditer(sql):
+            punct = token.group('punct')
+            if punct == '(':
                 braces_deep += 1
-            elif token.match(sqlparse.tokens.Punctuation, ')'):
+            elif punct == ')':
                 braces_deep -= 1
                 if braces_deep < 0:
                     # End of columns and constraints for table definition.
                     break
-            elif braces_deep == 0 and token.match(sqlparse.tokens.Punctuation, ','):
-                # End of current column or constraint definition.
-                break
-            
-            if token.ttype in (sqlparse.tokens.Name, sqlparse.tokens.Keyword):
-                if token.value in columns:
-                    check_columns.append(token.value)
-            elif token.ttype == sqlparse.tokens.Literal.String.Symbol:
-                if token.value[1:-1] in columns:
-                    check_columns.append(token.value[1:-1])
+            elif punct == ',':
+                if braces_deep == 0:
+                    # End of current column or constraint definition.
+                    break
+            else:
+                name = token.group('word') or token.group('quoted')
+                if name in columns:
+                    check_columns.append(name)
         
         return check_columns
             
@@ -246,23 +420,20 @@ WHERE FK_TBL_NAME = Upper(%s) """
         one or more columns.
         """
         constraints = {}
+        snapshot = self._snapshot_of(table_name)
         # Get the foreign keys
-        query = """
-            SELECT fk_name, fk_col_order, pk_tbl_name, pk_col_order
-            FROM system.sysforeignkey
-            WHERE fk_tbl_name = upper(%s)
-        """
-        cursor.execute(query, [table_name])
-        for constraint, fk_col_order, pk_tbl_name, pk_col_order in cursor.fetchall():
+        colnames = self.colname(cursor, table_name)
+        for constraint, fk_col_order, pk_tbl_name, pk_col_order in self._foreign_key_rows(cursor, table_name):
             constraint = self.identifier_converter(constraint)
             pkcolIndex = self._bytes_to_list(pk_col_order)
             fkcolIndex = self._bytes_to_list(fk_col_order)
+            pkcolnames = self.colname(cursor, pk_tbl_name)
             fkcollist = []
             pkcollist = []
             i = 0
             while (i<len(fkcolIndex)):
-                fkcollist.append(self.colname(cursor, table_name)[fkcolIndex[i]])
-                pkcollist.append(self.colname(cursor, table_name)[pkcolIndex[i]])
+                fkcollist.append(colnames[fkcolIndex[i]])
+                pkcollist.append(pkcolnames[pkcolIndex[i]])
                 i += 1
             constraints[constraint] = {
                 'columns': fkcollist,
@@ -274,8 +445,14 @@ WHERE FK_TBL_NAME = Upper(%s) """
                 }
     
         #indexes (primary, unique, index)
-        cursor.execute("call SHOWINDEX('sysadm', '%s')" % table_name)
-        for table, non_unique, index, type_, colseq, column, asc_or_desc in [x[1:8] for x in cursor.fetchall()]:
+        key = self.identifier_converter(table_name)
+        if snapshot is not None and key in snapshot.indexes:
+            indexes = snapshot.indexes[key]
+        else:
+            indexes = self._fetch_indexes(cursor, table_name)
+            if snapshot is not None:
+                snapshot.indexes[key] = indexes
+        for table, non_unique, index, type_, colseq, column, asc_or_desc in indexes:
             index = self.identifier_converter(index)
             if index not in constraints:
                 constraints[index] = {
@@ -291,17 +468,21 @@ WHERE FK_TBL_NAME = Upper(%s) """
             constraints[index]['foreign_key'] = None
         
         #column constraint
-        query = """
-            SELECT constr, column_name
-            FROM system.syscolumn
-            WHERE table_name = upper(%s) AND BLOBLEN(CONSTR)>0
-        """
-        cursor.execute(query, [table_name])
+        if snapshot is not None:
+            column_checks = snapshot.column_checks[key]
+        else:
+            query = """
+                SELECT constr, column_name
+                FROM system.syscolumn
+                WHERE table_name = upper(%s) AND BLOBLEN(CONSTR)>0
+            """
+            cursor.execute(query, [table_name])
+            column_checks = cursor.fetchall()
         
         unnamed_constrains_index = 0
-        for sql, column in cursor.fetchall():
+        for sql, column in column_checks:
             sql = sql.replace('value', self.identifier_converter(column)) 
-            check_columns = self._parse_column_constraint(sql, self.colname(cursor, table_name));
+            check_columns = self._parse_column_constraint(sql, colnames)
             unnamed_constrains_index += 1
             constraints['__unnamed_constraint_%s__' % unnamed_constrains_index] = {
                 'check': True,
@@ -313,16 +494,20 @@ WHERE FK_TBL_NAME = Upper(%s) """
             } if check_columns else None
             
         #table constraint
-        query = """
-            SELECT constr
-            FROM system.systable
-            WHERE table_name = upper(%s) AND BLOBLEN(CONSTR)>0
-        """
-        cursor.execute(query, [table_name])
+        if snapshot is not None:
+            table_checks = snapshot.table_checks[key]
+        else:
+            query = """
+                SELECT constr
+                FROM system.systable
+                WHERE table_name = upper(%s) AND BLOBLEN(CONSTR)>0
+            """
+            cursor.execute(query, [table_name])
+            table_checks = cursor.fetchall()
         
         #table constraint
-        for sql in cursor.fetchall():
-            check_columns = self._parse_column_constraint(sql[0], self.colname(cursor, table_name));
+        for sql in table_checks:
+            check_columns = self._parse_column_constraint(sql[0], colnames)
             unnamed_constrains_index += 1
             constraints['__unnamed_constraint_%s__' % unnamed_constrains_index] = {
                 'check': True,
@@ -0,0 +1,64 @@
+"""
+dbmaker_index_advisor management command: rank the indexes missing for the
+queries recorded in the query_stats_file of a DBMaker database, and list the
+indexes none of them used.
+"""
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from django_dbmaker.advisor import IndexAdvisor, QueryStats
+
+
+class Command(BaseCommand):
+    help = (
+        'Suggests indexes for the queries recorded in the query_stats_file '
+        'option of a DBMaker database, and lists indexes no recorded query used.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='Nominates a database to advise on. Defaults to the "default" database.',
+        )
+        parser.add_argument(
+            '--stats',
+            help='Stats file to read. Defaults to the query_stats_file option of the database.',
+        )
+        parser.add_argument(
+            '--limit', type=int, default=20,
+            help='Number of suggestions shown. Defaults to 20.',
+        )
+
+    def handle(self, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'dbmaker':
+            raise CommandError('%s is not a DBMaker database.' % options['database'])
+        path = options['stats'] or connection.settings_dict['OPTIONS'].get('query_stats_file')
+        if not path:
+            raise CommandError('No stats file: pass --stats or set the query_stats_file option.')
+        if not os.path.exists(path):
+            raise CommandError('Stats file %s does not exist.' % path)
+        advisor = IndexAdvisor(connection, QueryStats().load(path))
+        qn = connection.ops.quote_name
+
+        self.stdout.write('Suggested indexes:')
+        suggestions = advisor.suggestions()[:options['limit']]
+        for suggestion in suggestions:
+            note = ' (extends %s)' % suggestion.extends if suggestion.extends else ''
+            self.stdout.write('  %8.3fs %7d queries  %s (%s)%s' % (
+                suggestion.time, suggestion.count, qn(suggestion.table),
+                ', '.join(qn(column) for column in suggestion.columns), note,
+            ))
+        if not suggestions:
+            self.stdout.write('  None.')
+
+        self.stdout.write('Indexes no recorded query used:')
+        unused = advisor.unused_indexes()
+        for index in unused:
+            self.stdout.write('  %s on %s (%s)' % (
+                qn(index.name), qn(index.table), ', '.join(qn(column) for column in index.columns),
+            ))
+        if not unused:
+            self.stdout.write('  None.')
@@ -0,0 +1,40 @@
+"""
+dbmaker_inspectdb management command: Django's inspectdb, with the catalog
+of a DBMaker database read up front so that large schemas don't have to be
+introspected one table at a time through a single cursor.
+"""
+from django.core.management.commands import inspectdb
+from django.db import connections
+
+
+class Command(inspectdb.Command):
+    help = (
+        inspectdb.Command.help + ' Reads the whole DBMaker catalog up front, '
+        'and the per-table index lists over --jobs connections in parallel.'
+    )
+
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+        parser.add_argument(
+            '--jobs', type=int, default=4,
+            help='Number of extra connections used to read indexes. Defaults to 4.',
+        )
+
+    def handle_inspection(self, options):
+        connection = connections[options['database']]
+        if connection.vendor == 'dbmaker':
+            self.load_catalog(connection, options)
+        # The models are written by inspectdb itself, in its table order, from
+        # what is now in memory.
+        return super(Command, self).handle_inspection(options)
+
+    def load_catalog(self, connection, options):
+        introspection = connection.introspection
+        with connection.cursor() as cursor:
+            snapshot = introspection.load_schema_snapshot(cursor)
+        types = {'t'}
+        if options['include_views']:
+            types.add('v')
+        table_names = options['table'] or [info.name for info in snapshot.tables if info.type in types]
+        if options['jobs'] > 1:
+            introspection.prefetch_indexes(table_names, options['jobs'])
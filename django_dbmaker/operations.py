@@ -42,6 +42,8 @@
 
 import datetime
 import decimal
+import functools
+import json
 import time
 import uuid
 from _decimal import Decimal
@@ -60,6 +62,15 @@ from django.utils.dateparse import parse_date, parse_time, parse_datetime
 
 from django.utils import timezone
 
+
+@functools.lru_cache(maxsize=None)
+def _decimal_quantizer(max_digits, decimal_places):
+    """
+    Return the (exponent, context) pair used to quantize values bound to a
+    decimal(max_digits, decimal_places) column. Built once per column shape.
+    """
+    return Decimal(1).scaleb(-decimal_places), decimal.Context(prec=max_digits)
+
 class DatabaseOperations(BaseDatabaseOperations):
     compiler_module = "django_dbmaker.compiler"
         
@@ -69,6 +80,13 @@ class DatabaseOperations(BaseDatabaseOperations):
         'BigAutoField': 'BIGINT',
         'TextField': cast_char_field_without_max_length,
     }
+
+    # DBMaker has no EXPLAIN keyword: plans are dumped by the server for
+    # statements compiled while DUMP PLAN is on, see fetch_query_plan().
+    explain_prefix = 'SET DUMP PLAN ON'
+    explain_plan_on_sql = (explain_prefix, 'SET PLANONLY ON')
+    explain_plan_off_sql = ('SET PLANONLY OFF', 'SET DUMP PLAN OFF')
+
     def __init__(self, connection):
         super(DatabaseOperations, self).__init__(connection) 
         self.connection = connection
@@ -278,6 +296,56 @@ class DatabaseOperations(BaseDatabaseOperations):
 #         cursor.execute("SELECT cast(count(*) as bigint) from %s" % table_name)
         return cursor.fetchone()[0]
      
+    def fetch_query_plan(self, cursor, sql, params=()):
+        """
+        Return DBMaker's execution plan for the given statement as a list of
+        text lines. The statement is compiled with PLANONLY on, so it is
+        never actually executed.
+        """
+        try:
+            # Inside the try, so a failure turning PLANONLY on still turns
+            # DUMP PLAN off again.
+            for statement in self.explain_plan_on_sql:
+                cursor.execute(statement)
+            cursor.execute(sql, params)
+            # The plan comes back as informational messages of the statement
+            # (pyodbc >= 4.0.31); older drivers return it as a result set.
+            lines = [message[1] for message in getattr(cursor, 'messages', None) or ()]
+            if not lines and cursor.description:
+                lines = [' '.join(str(c) for c in row) for row in cursor.fetchall()]
+        finally:
+            error = None
+            for statement in self.explain_plan_off_sql:
+                try:
+                    cursor.execute(statement)
+                except utils.Error as e:
+                    error = error or e
+            if error is not None:
+                raise error
+        plan = []
+        for line in lines:
+            plan.extend(l.rstrip() for l in str(line).splitlines() if l.strip())
+        return plan
+
+    def format_query_plan(self, plan, format=None):
+        """
+        Render the lines returned by fetch_query_plan() in the requested
+        explain format. JSON nests each step under the step that is less
+        indented than itself.
+        """
+        if not format or format.upper() == 'TEXT':
+            return plan
+        root = {'children': []}
+        stack = [(-1, root)]
+        for line in plan:
+            depth = len(line) - len(line.lstrip())
+            node = {'operation': line.strip(), 'children': []}
+            while stack[-1][0] >= depth:
+                stack.pop()
+            stack[-1][1]['children'].append(node)
+            stack.append((depth, node))
+        return [json.dumps(root['children'], indent=2)]
+
     def fetch_returned_insert_id(self, cursor):
         """
         Given a cursor object that has just performed an INSERT/OUTPUT statement
@@ -335,18 +403,48 @@ class DatabaseOperations(BaseDatabaseOperations):
 
         The `style` argument is a Style object as returned by either
         color_style() or no_style() in django.core.management.color.
+
+        Tables that the connections of this process saw emptied, and haven't
+        inserted into since, are skipped, and so are SERIAL columns restarted
+        since the last insert into their table (see WrittenTables).
         """
+        written, key = self.connection.written_tables, self.connection.written_table_key
+        tables = [table for table in tables if not written.is_empty(key(table))]
+        sequences = [sequence for sequence in sequences if not written.serial_at_start(key(sequence['table']))]
+        sql = []
         if tables:
-            sql = ['CALL SETSYSTEMOPTION(\'FKCHK\', \'0\');']
+            sql.append('CALL SETSYSTEMOPTION(\'FKCHK\', \'0\');')
             for table in tables:
                 sql.append('%s %s;' % (
                     style.SQL_KEYWORD('DELETE FROM '),
                     style.SQL_FIELD(self.quote_name(table)),
                 ))
             sql.append('CALL SETSYSTEMOPTION(\'FKCHK\', \'1\');')
-            return sql
-        else:
-            return []
+        sql.extend(self.sequence_reset_by_name_sql(style, sequences))
+        return sql
+
+    def sequence_reset_by_name_sql(self, style, sequences):
+        """
+        Restart the SERIAL columns in ``sequences`` at their first value:
+        the table's OPTIONS['table_storage'] serial_start, or 1. DBMaker has
+        no sequence objects; the column is redeclared with a new start value,
+        which rewrites the table, so call this on empty tables only.
+        """
+        storage = self.connection.settings_dict['OPTIONS'].get('table_storage', {})
+        sql = []
+        for sequence in sequences:
+            if not sequence['column']:
+                continue
+            start = storage.get(sequence['table'], {}).get('serial_start', 1)
+            sql.append('%s %s %s %s %s %s;' % (
+                style.SQL_KEYWORD('ALTER TABLE'),
+                style.SQL_TABLE(self.quote_name(sequence['table'])),
+                style.SQL_KEYWORD('MODIFY COLUMN'),
+                style.SQL_FIELD(self.quote_name(sequence['column'])),
+                style.SQL_KEYWORD('TYPE TO'),
+                style.SQL_KEYWORD('%s(%d)' % (sequence.get('type', 'serial'), start)),
+            ))
+        return sql
 
     #def sequence_reset_sql(self, style, model_list):
     #    """
@@ -431,8 +529,15 @@ class DatabaseOperations(BaseDatabaseOperations):
         Transform a decimal.Decimal value to an object compatible with what is
         expected by the backend driver for decimal (numeric) columns.
         """
-        strvalue = super().adapt_decimalfield_value(value, max_digits, decimal_places)
-        return Decimal(strvalue)
+        if value is None:
+            return None
+        if decimal_places is None or not isinstance(value, Decimal):
+            strvalue = super().adapt_decimalfield_value(value, max_digits, decimal_places)
+            return Decimal(strvalue)
+        # Quantizing gives the same digits and exponent as the
+        # format_number() -> Decimal(str) round trip, without the string.
+        exponent, context = _decimal_quantizer(max_digits, decimal_places)
+        return value.quantize(exponent, context=context)
     
     def year_lookup_bounds(self, value):
         """
@@ -516,7 +621,9 @@ class DatabaseOperations(BaseDatabaseOperations):
         return value
 
     def convert_uuidfield_value(self, value, expression, connection):
-        if value is not None:
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            value = uuid.UUID(bytes=bytes(value))
+        elif value is not None:
             value = uuid.UUID(value)
         return value
     
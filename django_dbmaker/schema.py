@@ -1,15 +1,65 @@
+import collections
 import datetime
+import logging
+import re
+import uuid
+from contextlib import contextmanager
+
 from django.db.backends.ddl_references import (
     Columns, ForeignKeyName, Statement, Table,
 )
-from django.db.backends.utils import split_identifier
+import pyodbc as Database
+from django.db import NotSupportedError, models, transaction
+from django.db.backends.utils import split_identifier, truncate_name
 from django.db.backends.base.schema import BaseDatabaseSchemaEditor
 from django.db.models import NOT_PROVIDED
 
+from .fields import DigestField, fill_digests
+
+logger = logging.getLogger('django.db.backends.schema')
+
+# Statements that read or rewrite an existing table, and the ALTER TABLE
+# forms among them that only change the catalog.
+_table_pass_re = re.compile(
+    r'^\s*(?:ALTER\s+TABLE|CREATE\s+(?:UNIQUE\s+)?INDEX\s+\S+\s+ON)\s+("[^"]+"|\S+)',
+    re.IGNORECASE,
+)
+_catalog_only_re = re.compile(
+    r'\b(?:(?:SET|DROP)\s+DEFAULT|NAME\s+TO|DROP\s+(?:CONSTRAINT|FOREIGN\s+KEY|PRIMARY\s+KEY))\b',
+    re.IGNORECASE,
+)
+_create_index_re = re.compile(
+    r'^\s*(?:CREATE\s+(?:UNIQUE\s+)?INDEX\b|ALTER\s+TABLE\s+\S+\s+ADD\s+CONSTRAINT\s+\S+\s+UNIQUE\b)',
+    re.IGNORECASE,
+)
+_add_fk_re = re.compile(r'^\s*ALTER\s+TABLE\s+\S+\s+ADD\s+CONSTRAINT\s+\S+\s+FOREIGN\s+KEY\b', re.IGNORECASE)
+
 
 class DatabaseSchemaEditor(BaseDatabaseSchemaEditor):
     
     sql_retablespace_table = "ALTER TABLE %(table)s MOVE TABLESPACE %(new_tablespace)s"
+    sql_create_columns = "ALTER TABLE %(table)s ADD COLUMN (%(definitions)s)"
+    sql_copy_column_range = (
+        "UPDATE %(table)s SET %(shadow)s = %(column)s "
+        "WHERE %(pk)s >= %%s AND %(pk)s < %%s"
+    )
+    sql_copy_column_changed = (
+        "UPDATE %(table)s SET %(shadow)s = %(column)s "
+        "WHERE %(shadow)s <> %(column)s OR (%(shadow)s IS NULL AND %(column)s IS NOT NULL) "
+        "OR (%(shadow)s IS NOT NULL AND %(column)s IS NULL)"
+    )
+    sql_lock_table = "LOCK TABLE %(table)s IN EXCLUSIVE MODE"
+    sql_table_tablespace = "IN %(tablespace)s"
+    sql_table_lock_mode = "LOCK MODE %(lock_mode)s"
+    sql_table_fill_factor = "FILLFACTOR %(fill_factor)d"
+    sql_table_nocache = "NOCACHE"
+    # ODBC type codes the introspected columns of each compact type have.
+    compact_type_codes = {
+        'binary': (Database.SQL_BINARY, Database.SQL_VARBINARY),
+        'smallint': (Database.SQL_SMALLINT,),
+        'varchar': (Database.SQL_VARCHAR,),
+    }
+    table_lock_modes = ('TABLE', 'PAGE', 'ROW')
     sql_alter_column_type = "MODIFY COLUMN %(column)s TYPE TO %(type)s"
     sql_alter_column_null = "MODIFY COLUMN %(column)s NOT NULL TO NULL"
     sql_alter_column_not_null = "MODIFY COLUMN %(column)s NULL TO NOT NULL"
@@ -39,6 +89,210 @@ class DatabaseSchemaEditor(BaseDatabaseSchemaEditor):
 
     def skip_default(self, field):
         return self._is_limited_data_type(field)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Columns queued by add_field(), all for the same table.
+        self._pending_columns = []
+        # Statements that had to read or rewrite each existing table.
+        self.table_passes = collections.Counter()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush_pending_columns()
+            deferred_sql, self.deferred_sql = self.deferred_sql, []
+            self.run_deferred_sql(deferred_sql)
+        else:
+            self._pending_columns = []
+            self.connection.pending_ddl = None
+        super().__exit__(exc_type, exc_value, traceback)
+        if exc_type is None and self.table_passes:
+            logger.info(
+                '%d table pass(es) over %d table(s): %s',
+                sum(self.table_passes.values()), len(self.table_passes),
+                ', '.join('%s x%d' % item for item in sorted(self.table_passes.items())),
+            )
+
+    def execute(self, sql, params=()):
+        if self._pending_columns:
+            self.flush_pending_columns()
+        self._note_statement(str(sql))
+        super().execute(sql, params)
+
+    def _note_statement(self, sql):
+        match = _table_pass_re.match(sql)
+        if match and not _catalog_only_re.search(sql):
+            self.table_passes[match.group(1).strip('"')] += 1
+
+    def run_deferred_sql(self, statements):
+        """
+        Run deferred DDL in three steps: statements that build neither an
+        index nor a foreign key, in order; then the indexes, with the tables
+        spread over OPTIONS['ddl_jobs'] connections; then the foreign keys,
+        whose validation can use the indexes just built.
+        """
+        indexes = collections.OrderedDict()
+        foreign_keys = []
+        for statement in statements:
+            sql = str(statement)
+            if _create_index_re.match(sql):
+                table = _table_pass_re.match(sql).group(1)
+                indexes.setdefault(table, []).append(statement)
+            elif _add_fk_re.match(sql):
+                foreign_keys.append(statement)
+            else:
+                self.execute(statement)
+        jobs = min(self.connection.settings_dict['OPTIONS'].get('ddl_jobs', 1), len(indexes))
+        if jobs > 1 and not self.collect_sql and not self.connection.in_atomic_block:
+            self._run_in_parallel(list(indexes.values()), jobs)
+        else:
+            for table_statements in indexes.values():
+                for statement in table_statements:
+                    self.execute(statement)
+        for statement in foreign_keys:
+            self.execute(statement)
+
+    def _run_in_parallel(self, groups, jobs):
+        """
+        Run each group of statements in order on one of ``jobs`` extra
+        connections; different groups may run at the same time.
+        """
+        self.flush_pending_columns()
+        for group in groups:
+            for statement in group:
+                self._note_statement(str(statement))
+                # The statements run on copies of this connection.
+                self.connection.invalidate_schema_snapshot(str(statement))
+                if self.connection.ddl_log is not None:
+                    self.connection.ddl_log.append((str(statement), ()))
+        chunks = [groups[i::jobs] for i in range(jobs)]
+
+        def run(cursor, chunk):
+            for group in chunk:
+                for statement in group:
+                    logger.debug('%s; (params ())', statement, extra={'params': (), 'sql': str(statement)})
+                    cursor.execute(str(statement))
+
+        self.connection.map_on_copies(run, chunks)
+
+    @contextmanager
+    def indexes_dropped(self, *models):
+        """
+        Drop the indexes and foreign keys Django built for ``models`` while
+        the block runs, e.g. around a bulk load, and build them again through
+        run_deferred_sql() afterwards. Primary keys and unique constraints are
+        kept. When the block raises, the rebuild is still attempted, but the
+        block's error is the one raised.
+        """
+        rebuild = []
+        for model in models:
+            with self.connection.cursor() as cursor:
+                existing = set(self.connection.introspection.get_constraints(cursor, model._meta.db_table))
+            table = self.quote_name(model._meta.db_table)
+            for statement in self._model_indexes_sql(model):
+                name = str(statement.parts['name'])
+                if name.strip('"').lower() in existing:
+                    self.execute(self.sql_delete_index % {'name': name, 'table': table})
+                    rebuild.append(statement)
+            for field in model._meta.local_fields:
+                if field.remote_field and field.db_constraint:
+                    statement = self._create_fk_sql(model, field, "_fk_%(to_table)s_%(to_column)s")
+                    name = str(statement.parts['name'])
+                    if name.strip('"').lower() in existing:
+                        self.execute(self.sql_delete_fk % {'name': name, 'table': table})
+                        rebuild.append(statement)
+        try:
+            yield
+        except Exception:
+            try:
+                self.run_deferred_sql(rebuild)
+            except Exception:
+                logger.exception('Could not rebuild the indexes dropped for %s',
+                                 ', '.join(model._meta.db_table for model in models))
+            raise
+        self.run_deferred_sql(rebuild)
+
+    def create_model(self, model):
+        # Only create_model() formats sql_create_table; the physical options
+        # are appended for this table (and restored for any M2M tables
+        # created along the way).
+        template = self.sql_create_table
+        self.sql_create_table = type(self).sql_create_table + self._table_storage_sql(model)
+        try:
+            super().create_model(model)
+        finally:
+            self.sql_create_table = template
+
+    def _table_storage(self, model):
+        """
+        Return the OPTIONS['table_storage'] entry for the model's table,
+        checking its keys and values.
+        """
+        storage = self.connection.settings_dict['OPTIONS'].get('table_storage', {}).get(model._meta.db_table, {})
+        unknown = set(storage) - {'lock_mode', 'fill_factor', 'nocache', 'serial_start'}
+        if unknown:
+            raise ValueError("Unknown table_storage option(s) for %s: %s" % (
+                model._meta.db_table, ', '.join(sorted(unknown))))
+        if 'lock_mode' in storage and storage['lock_mode'].upper() not in self.table_lock_modes:
+            raise ValueError("lock_mode for %s must be one of %s." % (
+                model._meta.db_table, ', '.join(self.table_lock_modes)))
+        if 'fill_factor' in storage and not 1 <= storage['fill_factor'] <= 100:
+            raise ValueError("fill_factor for %s must be between 1 and 100." % model._meta.db_table)
+        return storage
+
+    def _table_storage_sql(self, model):
+        storage = self._table_storage(model)
+        clauses = []
+        # ops.tablespace_sql() stays empty, so indexes aren't given one.
+        if model._meta.db_tablespace and self.connection.features.supports_tablespaces:
+            clauses.append(self.sql_table_tablespace % {'tablespace': self.quote_name(model._meta.db_tablespace)})
+        if 'lock_mode' in storage:
+            clauses.append(self.sql_table_lock_mode % {'lock_mode': storage['lock_mode'].upper()})
+        if 'fill_factor' in storage:
+            clauses.append(self.sql_table_fill_factor % {'fill_factor': storage['fill_factor']})
+        if storage.get('nocache'):
+            clauses.append(self.sql_table_nocache)
+        return ''.join(' ' + clause for clause in clauses)
+
+    def _constraint_names(self, *args, **kwargs):
+        # Introspection may be answered from memory without touching the
+        # cursor, so the queued columns must exist first.
+        self.flush_pending_columns()
+        return super()._constraint_names(*args, **kwargs)
+
+    def flush_pending_columns(self):
+        """
+        Add the columns queued by add_field() with one ALTER TABLE, then drop
+        the defaults that were only there to fill the existing rows.
+        """
+        pending, self._pending_columns = self._pending_columns, []
+        self.connection.pending_ddl = None
+        if not pending:
+            return
+        table = self.quote_name(pending[0][0])
+        if len(pending) == 1:
+            _, column, definition, params, _ = pending[0]
+            sql = self.sql_create_column % {
+                "table": table,
+                "column": self.quote_name(column),
+                "definition": definition,
+            }
+        else:
+            sql = self.sql_create_columns % {
+                "table": table,
+                "definitions": ", ".join(
+                    "%s %s" % (self.quote_name(column), definition)
+                    for _, column, definition, _, _ in pending
+                ),
+            }
+            params = [param for _, _, _, column_params, _ in pending for param in column_params]
+        self.execute(sql, params)
+        for _, _, _, _, drop_default in pending:
+            if drop_default is not None:
+                self.execute(*drop_default)
+        # Reset connection if required
+        if self.connection.features.connection_persists_old_columns:
+            self.connection.close()
     
     def add_field(self, model, field):
         """
@@ -76,30 +330,30 @@ class DatabaseSchemaEditor(BaseDatabaseSchemaEditor):
             default = self.prepare_default(default_val)
             definition += " give " + default
                        
-        # Build the SQL and run it
-        sql = self.sql_create_column % {
-            "table": self.quote_name(model._meta.db_table),
-            "column": self.quote_name(field.column),
-            "definition": definition,
-        }
-        self.execute(sql, params)
-        # Drop the default if we need to
+        # Drop the default once the column exists
         # (Django usually does not use in-database defaults)
+        drop_default = None
         if not self.skip_default(field) and self.effective_default(field) is not None:
-            changes_sql, params = self._alter_column_default_sql(model, None, field, drop=True)
-            sql = self.sql_alter_column % {
+            changes_sql, changes_params = self._alter_column_default_sql(model, None, field, drop=True)
+            drop_default = (self.sql_alter_column % {
                 "table": self.quote_name(model._meta.db_table),
                 "changes": changes_sql,
-            }
-            self.execute(sql, params)
+            }, changes_params)
+        # Queue the column so that consecutive additions to the same table
+        # share one ALTER TABLE; any other SQL on the connection flushes it.
+        table = model._meta.db_table
+        if self._pending_columns and self._pending_columns[0][0] != table:
+            self.flush_pending_columns()
+        self._pending_columns.append((table, field.column, definition, params, drop_default))
+        self.connection.pending_ddl = self.flush_pending_columns
+        # Digest existing rows before the digest index is built.
+        if isinstance(field, DigestField) and not self.collect_sql:
+            fill_digests(self.connection, model, field)
         # Add an index, if required
         self.deferred_sql.extend(self._field_indexes_sql(model, field))
         # Add any FK constraints later
         if field.remote_field and self.connection.features.supports_foreign_keys and field.db_constraint:
             self.deferred_sql.append(self._create_fk_sql(model, field, "_fk_%(to_table)s_%(to_column)s"))
-        # Reset connection if required
-        if self.connection.features.connection_persists_old_columns:
-            self.connection.close()
 
     def _create_fk_sql(self, model, field, suffix):
         def create_fk_name(*args, **kwargs):
@@ -170,6 +424,11 @@ class DatabaseSchemaEditor(BaseDatabaseSchemaEditor):
         # Check for fields that aren't actually columns (e.g. M2M)
         if sql is None:
             return None, None
+        # SERIAL(n) starts numbering at n
+        if field.get_internal_type() in ('AutoField', 'BigAutoField'):
+            serial_start = self._table_storage(model).get('serial_start')
+            if serial_start is not None:
+                sql += '(%d)' % serial_start
         # Work out nullability
         null = field.null
         # If we were told to include a default value, do so
@@ -209,6 +468,239 @@ class DatabaseSchemaEditor(BaseDatabaseSchemaEditor):
         # Return the sql
         return sql, params   
    
+    def _alter_field(self, model, old_field, new_field, old_type, new_type,
+                     old_db_params, new_db_params, strict=False):
+        if old_type != new_type and old_field.get_internal_type() == new_field.get_internal_type() == 'UUIDField':
+            # Between char(32) and BinaryUUIDField's binary(16).
+            self._convert_uuid_column(model, old_field, new_field)
+            return
+        if old_type != new_type and self._can_alter_type_online(model, old_field, new_field):
+            self.alter_column_type_online(model, old_field, new_field)
+            return
+        super()._alter_field(model, old_field, new_field, old_type, new_type,
+                             old_db_params, new_db_params, strict)
+
+    def _can_alter_type_online(self, model, old_field, new_field):
+        """
+        Online type changes are enabled by OPTIONS['online_alter_batch_size']
+        and only cover a plain column whose type alone changes, on a table
+        with an integer primary key, outside a transaction. Columns with a
+        CHECK constraint before or after are excluded: the shadow column
+        would be added without it.
+        """
+        if not self.connection.settings_dict['OPTIONS'].get('online_alter_batch_size'):
+            return False
+        if self.collect_sql or self.connection.in_atomic_block:
+            return False
+        if old_field.column != new_field.column or old_field.null != new_field.null:
+            return False
+        for field in (old_field, new_field):
+            if field.primary_key or field.unique or field.db_index or field.remote_field:
+                return False
+            if field.db_parameters(connection=self.connection)['check']:
+                return False
+        return model._meta.pk.get_internal_type() in (
+            'AutoField', 'BigAutoField', 'IntegerField', 'BigIntegerField',
+            'SmallIntegerField', 'PositiveIntegerField', 'PositiveSmallIntegerField',
+        )
+
+    def alter_column_type_online(self, model, old_field, new_field):
+        """
+        Change a column's type without rewriting the table in one statement,
+        through a shadow column filled in primary key ranges of
+        OPTIONS['online_alter_batch_size'] rows (see _replace_column()). The
+        column moves to the end of the table.
+        """
+        def copy_range(cursor, names, start, stop):
+            cursor.execute(self.sql_copy_column_range % names, [start, stop])
+
+        def catch_up(cursor, names):
+            cursor.execute(self.sql_copy_column_changed % names)
+
+        self._replace_column(
+            model, new_field, new_field.db_parameters(connection=self.connection)['type'],
+            copy_range, catch_up, self.connection.settings_dict['OPTIONS']['online_alter_batch_size'],
+        )
+
+    def _replace_column(self, model, field, definition, copy_range, catch_up, batch_size):
+        """
+        Replace the column of ``field`` by one of type ``definition``: add a
+        shadow column, fill it with copy_range(cursor, names, start, stop)
+        for each primary key range, each in its own transaction, then lock
+        the table, let catch_up(cursor, names) copy the rows written
+        meanwhile, drop the old column and give the shadow its name, all in
+        one transaction. Writers wait on the lock instead of being lost. If
+        anything fails before the old column is dropped, the shadow column is
+        dropped again.
+        """
+        column = field.column
+        shadow = truncate_name('%s__new' % column, self.connection.ops.max_name_length())
+        names = {
+            'table': self.quote_name(model._meta.db_table),
+            'column': self.quote_name(column),
+            'shadow': self.quote_name(shadow),
+            'pk': self.quote_name(model._meta.pk.column),
+        }
+        self.execute(self.sql_create_column % {
+            'table': names['table'],
+            'column': names['shadow'],
+            'definition': definition,
+        })
+        replaced = False
+        try:
+            for start, stop in self._pk_ranges(names, batch_size):
+                with transaction.atomic(using=self.connection.alias):
+                    with self.connection.cursor() as cursor:
+                        copy_range(cursor, names, start, stop)
+            # Not atomic(): the schema editor refuses DDL inside it.
+            self.connection.set_autocommit(False)
+            try:
+                with self.connection.cursor() as cursor:
+                    cursor.execute(self.sql_lock_table % names)
+                    catch_up(cursor, names)
+                if not field.null:
+                    self.execute(self.sql_alter_column % {
+                        'table': names['table'],
+                        'changes': self.sql_alter_column_not_null % {'column': names['shadow']},
+                    })
+                self.execute(self.sql_delete_column % {'table': names['table'], 'column': names['column']})
+                replaced = True
+                self.execute(self.sql_rename_column % {
+                    'table': names['table'],
+                    'old_column': names['shadow'],
+                    'new_column': names['column'],
+                })
+                self.connection.commit()
+            except Exception:
+                self.connection.rollback()
+                raise
+            finally:
+                self.connection.set_autocommit(True)
+        except Exception:
+            if not replaced:
+                self.execute(self.sql_delete_column % {'table': names['table'], 'column': names['shadow']})
+            raise
+
+    def _pk_ranges(self, names, batch_size):
+        """
+        Yield [start, stop) ranges of batch_size primary key values covering
+        the table, logging the progress of the copy into the shadow column
+        after each range.
+        """
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT MIN(%(pk)s), MAX(%(pk)s) FROM %(table)s" % names)
+            low, high = cursor.fetchone()
+        if low is None:
+            return
+        total = high - low + 1
+        for start in range(low, high + 1, batch_size):
+            yield start, start + batch_size
+            logger.info(
+                'Copying %s.%s to %s: %d%% of the key range done',
+                names['table'], names['column'], names['shadow'],
+                min(start + batch_size - low, total) * 100 // total,
+            )
+
+    def convert_to_compact_types(self, model):
+        """
+        Change the model's existing columns to the types chosen by
+        OPTIONS['compact_types'], for use from a RunPython migration. The
+        values fit the smaller types as they are, so columns change type in
+        place.
+        """
+        standard_types = type(self.connection).data_types
+        with self.connection.cursor() as cursor:
+            current_types = {
+                info.name: (info.type_code, info.internal_size)
+                for info in self.connection.introspection.get_table_description(cursor, model._meta.db_table)
+            }
+        for field in model._meta.local_fields:
+            internal_type = field.get_internal_type()
+            if self.connection.data_types.get(internal_type) == standard_types.get(internal_type):
+                continue
+            if self._column_has_type(current_types.get(field.column.lower()), field.db_type(self.connection)):
+                continue
+            self.execute(self.sql_alter_column % {
+                'table': self.quote_name(model._meta.db_table),
+                'changes': self.sql_alter_column_type % {
+                    'column': self.quote_name(field.column),
+                    'type': field.db_type(self.connection),
+                },
+            })
+
+    def _column_has_type(self, current, db_type):
+        """
+        Return whether a column whose introspected (type_code, size) is
+        ``current`` already has the compact type ``db_type``.
+        """
+        if current is None:
+            return False
+        match = re.match(r'(\w+)(?:\((\d+)\))?$', db_type)
+        type_codes = self.compact_type_codes.get(match.group(1).lower(), ()) if match else ()
+        type_code, size = current
+        return type_code in type_codes and (match.group(2) is None or size == int(match.group(2)))
+
+    def _convert_uuid_column(self, model, old_field, new_field):
+        """
+        Turn the hex text of a UUID column into bytes, or back, through a
+        shadow column filled in primary key ranges. The database can't
+        compare the two, so the catch-up compares every row in Python. Keys
+        are refused before anything changes: the columns referencing them
+        would have to be converted in the same step.
+        """
+        table = model._meta.db_table
+        if old_field.primary_key or old_field.remote_field or new_field.primary_key or new_field.remote_field:
+            raise NotSupportedError(
+                "%s.%s is a key; convert it by recreating the table." % (table, old_field.column))
+        if old_field.column != new_field.column or old_field.null != new_field.null:
+            raise NotSupportedError(
+                "Convert %s.%s between text and binary UUIDs in an AlterField of "
+                "its own." % (table, old_field.column))
+        if self.collect_sql or self.connection.in_atomic_block:
+            raise NotSupportedError(
+                "Converting %s.%s between text and binary UUIDs copies its values; "
+                "it can't run inside a transaction or with sqlmigrate." % (table, old_field.column))
+        if not isinstance(model._meta.pk, (models.AutoField, models.IntegerField)):
+            raise NotSupportedError(
+                "Converting %s.%s between text and binary UUIDs requires an integer "
+                "primary key." % (table, old_field.column))
+        batch_size = self.connection.settings_dict['OPTIONS'].get('online_alter_batch_size') or 10000
+        binary = new_field.db_type(self.connection).lower().startswith('binary')
+
+        def convert(value):
+            if value is None:
+                return None
+            if isinstance(value, (bytes, bytearray, memoryview)):
+                value = uuid.UUID(bytes=bytes(value))
+            else:
+                value = uuid.UUID(value.strip())
+            return value.bytes if binary else value.hex
+
+        def copy_range(cursor, names, start, stop):
+            cursor.execute(
+                "SELECT %(pk)s, %(column)s FROM %(table)s "
+                "WHERE %(pk)s >= %%s AND %(pk)s < %%s AND %(column)s IS NOT NULL" % names,
+                [start, stop],
+            )
+            rows = [(convert(value), pk) for pk, value in cursor.fetchall()]
+            cursor.executemany("UPDATE %(table)s SET %(shadow)s = %%s WHERE %(pk)s = %%s" % names, rows)
+
+        def catch_up(cursor, names):
+            cursor.execute("SELECT %(pk)s, %(column)s, %(shadow)s FROM %(table)s" % names)
+            rows = [
+                (convert(value), pk) for pk, value, converted in cursor.fetchall()
+                if convert(value) != convert(converted)
+            ]
+            cursor.executemany("UPDATE %(table)s SET %(shadow)s = %%s WHERE %(pk)s = %%s" % names, rows)
+
+        self._replace_column(model, new_field, new_field.db_type(self.connection), copy_range, catch_up, batch_size)
+        # DROP COLUMN ... CASCADE took the column's index and unique
+        # constraint with it.
+        if new_field.unique:
+            self.execute(self._create_unique_sql(model, [new_field.column]))
+        for sql in self._field_indexes_sql(model, new_field):
+            self.execute(sql)
+
     def _alter_column_type_sql(self, table, old_field, new_field, new_type):
         return super(DatabaseSchemaEditor, self)._alter_column_type_sql(table, old_field, new_field, new_type)
     
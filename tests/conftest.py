@@ -0,0 +1,20 @@
+"""
+Settings for the backend's unit tests. They compile SQL and record the
+statements the backend would run; no database connection is opened, but
+pyodbc must be importable.
+
+Run from the repository root:
+
+    python -m pytest tests
+"""
+import django
+from django.conf import settings
+
+
+def pytest_configure():
+    settings.configure(
+        INSTALLED_APPS=['django_dbmaker', 'tests'],
+        DATABASES={'default': {'ENGINE': 'django_dbmaker', 'NAME': 'test', 'OPTIONS': {}}},
+        USE_TZ=False,
+    )
+    django.setup()
@@ -0,0 +1,19 @@
+from django.db import models
+
+from django_dbmaker.fields import DigestField
+
+
+class Author(models.Model):
+    name = models.CharField(max_length=50)
+    born = models.DateTimeField(null=True)
+
+
+class Book(models.Model):
+    title = models.CharField(max_length=100)
+    author = models.ForeignKey(Author, models.CASCADE)
+    pages = models.IntegerField()
+
+
+class Page(models.Model):
+    url = models.TextField()
+    url_digest = DigestField(source='url')
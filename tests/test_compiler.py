@@ -0,0 +1,102 @@
+import collections
+from unittest import mock
+
+from django.db import connection
+from django.db.models import CharField, F, Value
+from django.db.models.functions import TruncDay
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
+from django_dbmaker.compiler import SQLCompiler
+
+from .models import Author, Book
+
+
+def order_by_clause(queryset):
+    sql, params = queryset.query.get_compiler(connection=connection).as_sql()
+    return sql[sql.index(' ORDER BY ') + len(' ORDER BY '):]
+
+
+class NullsOrderingTests(SimpleTestCase):
+    def test_native_placement_is_a_plain_sort(self):
+        # NULLs sort as the largest value.
+        self.assertEqual(
+            order_by_clause(Author.objects.order_by(F('born').asc(nulls_last=True))),
+            '"tests_author"."born" ASC',
+        )
+        self.assertEqual(
+            order_by_clause(Author.objects.order_by(F('born').desc(nulls_first=True))),
+            '"tests_author"."born" DESC',
+        )
+
+    def test_not_null_column_is_a_plain_sort(self):
+        self.assertEqual(
+            order_by_clause(Book.objects.order_by(F('pages').asc(nulls_first=True))),
+            '"tests_book"."pages" ASC',
+        )
+
+    def test_nullable_column_against_native_placement(self):
+        self.assertEqual(
+            order_by_clause(Author.objects.order_by(F('born').asc(nulls_first=True))),
+            'CASE WHEN "tests_author"."born" IS NULL THEN 0 ELSE 1 END, "tests_author"."born" ASC',
+        )
+
+    def test_left_joined_column_is_nullable(self):
+        self.assertIn(
+            'CASE WHEN',
+            order_by_clause(Author.objects.order_by(F('book__pages').desc(nulls_last=True))),
+        )
+
+
+class CompiledSqlCacheTests(SimpleTestCase):
+    # The connection is used, with its cache replaced.
+    databases = {'default'}
+
+    def setUp(self):
+        for name, value in (('compiled_sql_cache', collections.OrderedDict()), ('compiled_sql_cache_size', 2)):
+            patcher = mock.patch.object(connection, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def compile(self, queryset):
+        return queryset.query.get_compiler(connection=connection).as_sql()
+
+    def test_off_by_default(self):
+        self.assertEqual(connection.settings_dict['OPTIONS'].get('compiled_sql_cache_size'), None)
+        with mock.patch.object(connection, 'compiled_sql_cache', None), \
+                mock.patch.object(SQLCompiler, '_compiled_sql_key') as key:
+            self.compile(Author.objects.filter(name='a'))
+        key.assert_not_called()
+
+    def test_same_shape_reuses_the_sql(self):
+        sql, params = self.compile(Author.objects.filter(name='a'))
+        with mock.patch.object(SQLCompiler, '_as_sql') as as_sql:
+            self.assertEqual(self.compile(Author.objects.filter(name='b')), (sql, ('b',)))
+        as_sql.assert_not_called()
+        self.assertEqual(params, ('a',))
+        self.assertEqual(len(connection.compiled_sql_cache), 1)
+
+    def test_least_recently_used_dropped(self):
+        self.compile(Author.objects.filter(name='a'))
+        self.compile(Author.objects.filter(born=None))
+        self.compile(Author.objects.filter(name='b'))
+        self.compile(Book.objects.all())
+        self.assertEqual(len(connection.compiled_sql_cache), 2)
+        with mock.patch.object(SQLCompiler, '_as_sql', side_effect=AssertionError('not cached')):
+            self.compile(Author.objects.filter(name='c'))
+            with self.assertRaisesMessage(AssertionError, 'not cached'):
+                self.compile(Author.objects.filter(born=None))
+
+    def test_parameters_outside_where_not_stored(self):
+        self.compile(Author.objects.annotate(label=Value('x', CharField())).filter(name='a'))
+        self.assertEqual(len(connection.compiled_sql_cache), 0)
+
+    @override_settings(USE_TZ=True)
+    def test_keyed_by_time_zone(self):
+        queryset = Author.objects.annotate(day=TruncDay('born')).filter(name='a')
+        with timezone.override('UTC'):
+            utc_sql, _ = self.compile(queryset)
+        with timezone.override('Asia/Taipei'):
+            local_sql, _ = self.compile(queryset)
+        self.assertNotEqual(utc_sql, local_sql)
+        self.assertEqual(len(connection.compiled_sql_cache), 2)
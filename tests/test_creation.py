@@ -0,0 +1,61 @@
+import os
+import pickle
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.db import connection
+from django.db.backends.base.introspection import TableInfo
+from django.test import SimpleTestCase
+
+from .utils import RecordingCursor
+
+
+class DropTablesTests(SimpleTestCase):
+    # The connection is used, with its cursor replaced.
+    databases = {'default'}
+
+    def test_only_tables_and_views_dropped(self):
+        statements = []
+        tables = [TableInfo('t1', 't'), TableInfo('v1', 'v'), TableInfo('SYSTABLE', None)]
+        with mock.patch.object(connection, 'cursor', lambda: RecordingCursor(statements)), \
+                mock.patch.object(connection.introspection, 'get_table_list', lambda cursor: tables):
+            connection.creation._drop_tables(connection)
+        self.assertEqual(statements, [
+            "CALL SETSYSTEMOPTION('FKCHK', '0')",
+            'DROP VIEW "v1"',
+            'DROP TABLE "t1"',
+            "CALL SETSYSTEMOPTION('FKCHK', '1')",
+        ])
+
+
+class TemplateTests(SimpleTestCase):
+    # The connection is used, with the database work replaced.
+    databases = {'default'}
+
+    def test_cache_tables_created_from_template(self):
+        ddl = [('CREATE TABLE "t1" ("id" INTEGER)', ())]
+        creation = connection.creation
+        with tempfile.TemporaryDirectory() as directory:
+            template = os.path.join(directory, 'default.pickle')
+            with open(template, 'wb') as f:
+                pickle.dump((ddl, []), f)
+
+            def createcachetable(name, database):
+                self.assertEqual((name, database), ('createcachetable', 'default'))
+                connection.ddl_log.append(('CREATE TABLE "cache" ("cache_key" VARCHAR(255))', ()))
+
+            with mock.patch.dict(connection.settings_dict), \
+                    mock.patch.dict(settings.DATABASES['default']), \
+                    mock.patch.object(creation, '_create_test_db'), \
+                    mock.patch.object(creation, '_drop_tables'), \
+                    mock.patch.object(creation, '_clone_db'), \
+                    mock.patch.object(connection, 'ensure_connection'), \
+                    mock.patch('django.core.management.call_command', createcachetable):
+                creation._create_test_db_from_template(template, 0, False, serialize=False)
+            self.addCleanup(setattr, creation, '_test_db_export', None)
+            self.addCleanup(setattr, creation, 'test_db_ddl', None)
+        # Replayed by the clones.
+        self.assertIs(creation._test_db_export[0], creation.test_db_ddl)
+        self.assertEqual(creation.test_db_ddl, ddl + [('CREATE TABLE "cache" ("cache_key" VARCHAR(255))', ())])
+        self.assertIsNone(connection.ddl_log)
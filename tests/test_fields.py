@@ -0,0 +1,148 @@
+import uuid
+from unittest import mock
+
+from django.core.exceptions import ValidationError
+from django.db import NotSupportedError, connection, models
+from django.db.models import Value
+from django.db.models.functions import Concat
+from django.test import SimpleTestCase
+from django.test.utils import isolate_apps
+
+from django_dbmaker.fields import AsciiCharField, BinaryUUIDField, fill_digests, text_digest
+
+from .models import Page
+from .utils import RecordingCursor
+
+UUID = uuid.UUID('12345678123456781234567812345678')
+
+
+class AsciiCharFieldTests(SimpleTestCase):
+
+    def test_db_type(self):
+        self.assertEqual(AsciiCharField(max_length=8).db_type(connection), 'varchar(8)')
+
+    def test_rejects_non_ascii(self):
+        field = AsciiCharField(max_length=8)
+        field.clean('abc', None)
+        with self.assertRaisesMessage(ValidationError, 'Enter ASCII characters only.'):
+            field.clean('caf\xe9', None)
+
+
+class BinaryUUIDFieldTests(SimpleTestCase):
+
+    def test_db_type(self):
+        self.assertEqual(BinaryUUIDField().db_type(connection), 'binary(16)')
+        self.assertEqual(models.UUIDField().db_type(connection), 'char(32)')
+
+    def test_bound_as_bytes(self):
+        self.assertEqual(BinaryUUIDField().get_db_prep_value(UUID, connection), UUID.bytes)
+        self.assertEqual(BinaryUUIDField().get_db_prep_value(str(UUID), connection), UUID.bytes)
+        self.assertIsNone(BinaryUUIDField().get_db_prep_value(None, connection))
+        # Plain UUIDFields of the same connection stay hex text.
+        self.assertEqual(models.UUIDField().get_db_prep_value(UUID, connection), UUID.hex)
+
+    def test_read_from_bytes(self):
+        self.assertEqual(connection.ops.convert_uuidfield_value(UUID.bytes, None, connection), UUID)
+        self.assertEqual(connection.ops.convert_uuidfield_value(UUID.hex, None, connection), UUID)
+
+
+@isolate_apps('tests')
+class ConvertUUIDColumnTests(SimpleTestCase):
+    # The connection is used, with its cursor replaced.
+    databases = {'default'}
+
+    def alter(self, old, new, statements):
+        attrs = {'__module__': __name__, 'Meta': type('Meta', (), {'db_table': 'item'})}
+        old_model = type('Old', (models.Model,), dict(attrs, ref=old))
+        new_model = type('New', (models.Model,), dict(attrs, ref=new))
+
+        def results(sql):
+            if sql.startswith('SELECT MIN'):
+                return [(1, 1)]
+            if '"ref__new"' in sql:
+                # The catch-up sees a row set to NULL during the copy.
+                return [(1, None, UUID.bytes)]
+            return [(1, UUID.hex + '  ')]
+
+        with mock.patch.object(connection, 'cursor', lambda: RecordingCursor(statements, results=results)), \
+                mock.patch.object(connection, 'set_autocommit', lambda autocommit: None), \
+                mock.patch.object(connection, 'commit', lambda: None), \
+                mock.patch('django_dbmaker.schema.transaction.atomic', mock.MagicMock()):
+            editor = connection.schema_editor()
+            editor.execute = lambda sql, params=(): statements.append(str(sql))
+            editor._constraint_names = lambda *args, **kwargs: []
+            editor.alter_field(old_model, old_model._meta.get_field('ref'), new_model._meta.get_field('ref'))
+
+    def test_text_to_binary(self):
+        statements = []
+        self.alter(models.UUIDField(null=True), BinaryUUIDField(null=True), statements)
+        self.assertEqual(statements[0], 'ALTER TABLE "item" ADD COLUMN "ref__new" binary(16)')
+        copies = [params for sql, params in (s for s in statements if isinstance(s, tuple))]
+        self.assertEqual(copies, [[(UUID.bytes, 1)], [(None, 1)]])
+        self.assertEqual(statements[-2:], [
+            'ALTER TABLE "item" DROP COLUMN "ref" CASCADE',
+            'ALTER TABLE "item" MODIFY "ref__new" NAME TO "ref"',
+        ])
+
+    def test_keys_refused(self):
+        with self.assertRaisesMessage(NotSupportedError, 'is a key'):
+            self.alter(models.UUIDField(unique=True, primary_key=True), BinaryUUIDField(primary_key=True), [])
+
+
+class DigestFieldTests(SimpleTestCase):
+    # The connection is used, with its cursor replaced.
+    databases = {'default'}
+
+    def update(self, queryset, **values):
+        statements = []
+
+        def cursor():
+            recording = RecordingCursor(statements)
+            recording.rowcount = 1
+            recording.close = lambda: None
+            return recording
+
+        with mock.patch.object(connection, 'cursor', cursor), \
+                mock.patch('django_dbmaker.compiler.transaction.atomic', mock.MagicMock()), \
+                mock.patch('django_dbmaker.compiler.fill_digests') as fill:
+            queryset.update(**values)
+        return statements, fill
+
+    def test_exact_lookup_probes_the_digest(self):
+        sql, params = Page.objects.filter(url='http://a').query.get_compiler(connection=connection).as_sql()
+        self.assertIn('("tests_page"."url_digest" = %s AND "tests_page"."url" = %s)', sql)
+        self.assertEqual(params, (text_digest('http://a'), 'http://a'))
+
+    def test_other_lookups_left_alone(self):
+        for queryset in (Page.objects.filter(url__startswith='http'), Page.objects.filter(url=None)):
+            sql, params = queryset.query.get_compiler(connection=connection).as_sql()
+            self.assertNotIn('url_digest', sql[sql.index(' WHERE '):])
+
+    def test_update_sets_the_digest(self):
+        statements, fill = self.update(Page.objects.filter(pk=1), url='http://a')
+        self.assertEqual(len(statements), 1)
+        self.assertIn('"url_digest" = %s', statements[0])
+        fill.assert_not_called()
+
+    def test_update_from_expression_fills_the_digest(self):
+        statements, fill = self.update(Page.objects.filter(pk=1), url=Concat('url', Value('/')))
+        self.assertIn('"url_digest" = NULL', statements[0])
+        fill.assert_called_once_with(connection, Page, Page._meta.get_field('url_digest'))
+
+    def test_fill_digests(self):
+        statements = []
+
+        # The keys to fill, then the two batches.
+        responses = iter([[(1,), (2,), (3,)], [(1, 'http://1'), (2, 'http://2')], [(3, 'http://3')]])
+        cursor = RecordingCursor(statements, results=lambda sql: next(responses))
+        with mock.patch.object(connection, 'cursor', lambda: cursor):
+            fill_digests(connection, Page, Page._meta.get_field('url_digest'), batch_size=2)
+        self.assertEqual(statements[0], (
+            'SELECT "id" FROM "tests_page" WHERE "url_digest" IS NULL AND "url" IS NOT NULL'
+        ))
+        self.assertEqual(statements[1], 'SELECT "id", "url" FROM "tests_page" WHERE "id" IN (%s, %s)')
+        self.assertEqual(statements[2], ('UPDATE "tests_page" SET "url_digest" = %s WHERE "id" = %s', [
+            (text_digest('http://1'), 1), (text_digest('http://2'), 2),
+        ]))
+        self.assertEqual(statements[3], 'SELECT "id", "url" FROM "tests_page" WHERE "id" IN (%s)')
+        self.assertEqual(statements[4][1], [(text_digest('http://3'), 3)])
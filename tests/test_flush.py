@@ -0,0 +1,71 @@
+from unittest import mock
+
+from django.core.management.color import no_style
+from django.db import connection
+from django.test import SimpleTestCase
+
+TABLES = ['tests_author', 'tests_book']
+SEQUENCES = [
+    {'table': 'tests_author', 'column': 'id', 'type': 'serial'},
+    {'table': 'tests_book', 'column': 'id', 'type': 'serial'},
+]
+
+
+class FlushTests(SimpleTestCase):
+    # The connection is used, with its transactions replaced.
+    databases = {'default'}
+
+    def setUp(self):
+        connection.written_tables.forget()
+        patches = [
+            mock.patch.object(connection, 'get_autocommit', lambda: True),
+            mock.patch.object(connection, 'on_commit', lambda func: func()),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def flush(self):
+        """
+        Return the flush statements, and note them as if they ran.
+        """
+        statements = connection.ops.sql_flush(no_style(), TABLES, SEQUENCES)
+        for sql in statements:
+            connection.note_write(sql)
+        return statements
+
+    def test_untouched_tables_skipped(self):
+        self.assertEqual(self.flush(), [
+            "CALL SETSYSTEMOPTION('FKCHK', '0');",
+            'DELETE FROM  "tests_author";',
+            'DELETE FROM  "tests_book";',
+            "CALL SETSYSTEMOPTION('FKCHK', '1');",
+            'ALTER TABLE "tests_author" MODIFY COLUMN "id" TYPE TO serial(1);',
+            'ALTER TABLE "tests_book" MODIFY COLUMN "id" TYPE TO serial(1);',
+        ])
+        # Restarting the counters didn't forget the emptied tables.
+        self.assertEqual(self.flush(), [])
+
+    def test_insert_spelled_differently(self):
+        for insert in ('INSERT INTO "tests_book"', 'INSERT INTO TESTS_BOOK (id)',
+                       'INSERT INTO SYSADM.tests_book', 'INSERT INTO "SYSADM"."tests_book"'):
+            with self.subTest(insert=insert):
+                self.flush()
+                connection.note_write(insert + ' VALUES (1)')
+                self.assertEqual(self.flush(), [
+                    "CALL SETSYSTEMOPTION('FKCHK', '0');",
+                    'DELETE FROM  "tests_book";',
+                    "CALL SETSYSTEMOPTION('FKCHK', '1');",
+                    'ALTER TABLE "tests_book" MODIFY COLUMN "id" TYPE TO serial(1);',
+                ])
+
+    def test_schema_change_forgets(self):
+        self.flush()
+        connection.note_write('CREATE TABLE "other" ("a" int)')
+        self.assertEqual(len(self.flush()), 6)
+
+    def test_serial_start(self):
+        options = dict(connection.settings_dict['OPTIONS'], table_storage={'tests_book': {'serial_start': 1000}})
+        with mock.patch.dict(connection.settings_dict, OPTIONS=options):
+            self.assertEqual(self.flush()[-1], 'ALTER TABLE "tests_book" MODIFY COLUMN "id" TYPE TO serial(1000);')
+            self.assertEqual(self.flush(), [])
@@ -0,0 +1,65 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import SimpleTestCase
+
+from django_dbmaker.introspection import SchemaSnapshot
+
+from .utils import RecordingCursor
+
+
+class SchemaSnapshotTests(SimpleTestCase):
+    # The connection is used, with its cursor replaced.
+    databases = {'default'}
+
+    def setUp(self):
+        self.introspection = connection.introspection
+        self.addCleanup(setattr, self.introspection, '_snapshot', None)
+
+    def loaded_snapshot(self):
+        snapshot = SchemaSnapshot()
+        snapshot.tables = []
+        snapshot.known.update(['book', 'author'])
+        self.introspection._snapshot = snapshot
+        return snapshot
+
+    def test_off_by_default(self):
+        statements = []
+        with mock.patch.object(self.introspection, 'load_schema_snapshot') as load:
+            self.introspection.get_table_list(RecordingCursor(statements))
+        load.assert_not_called()
+        self.assertIsNone(self.introspection._snapshot)
+        self.assertEqual(statements, ['SELECT trim(TABLE_NAME), trim(TABLE_TYPE) FROM INFORMATION_SCHEMA.TABLES'])
+
+    def test_opt_in(self):
+        options = dict(connection.settings_dict['OPTIONS'], schema_snapshot=True)
+        with mock.patch.dict(connection.settings_dict, OPTIONS=options), \
+                mock.patch.object(self.introspection, 'load_schema_snapshot') as load:
+            self.introspection.get_table_list(RecordingCursor([]))
+        load.assert_called_once()
+
+    def test_statements_that_keep_the_schema(self):
+        snapshot = self.loaded_snapshot()
+        for sql in [
+            'SELECT * FROM "book"',
+            'INSERT INTO "book" ("id") VALUES (?)',
+            'UPDATE "book" SET "title" = ?',
+            'DELETE FROM "book"',
+            'CREATE TEMP TABLE "book__stage" ("id" INTEGER)',
+        ]:
+            with self.subTest(sql=sql):
+                self.introspection.invalidate_schema_snapshot(sql)
+                self.assertIs(self.introspection._snapshot, snapshot)
+                self.assertEqual(snapshot.known, {'book', 'author'})
+
+    def test_ddl_forgets_its_table(self):
+        snapshot = self.loaded_snapshot()
+        self.introspection.invalidate_schema_snapshot('ALTER TABLE "book" ADD COLUMN "isbn" CHAR(13)')
+        self.assertIs(self.introspection._snapshot, snapshot)
+        self.assertEqual(snapshot.known, {'author'})
+        self.assertEqual(snapshot.tables, [])
+
+    def test_unknown_ddl_drops_the_snapshot(self):
+        self.loaded_snapshot()
+        self.introspection.invalidate_schema_snapshot('CREATE VIEW "recent" AS SELECT * FROM "book"')
+        self.assertIsNone(self.introspection._snapshot)
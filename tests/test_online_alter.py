@@ -0,0 +1,103 @@
+import contextlib
+import itertools
+import re
+from unittest import mock
+
+from django.db import connection, models
+from django.test import SimpleTestCase
+from django.test.utils import isolate_apps
+
+from .utils import RecordingCursor
+
+_check_re = re.compile(r'CHECK\s*\((.*)\)', re.IGNORECASE)
+
+
+_model_ids = itertools.count()
+
+
+def checks(statements):
+    return sorted(match.group(1) for sql in statements for match in _check_re.finditer(sql))
+
+
+@isolate_apps('tests')
+class OnlineAlterTests(SimpleTestCase):
+    # The connection is used, with its cursor replaced.
+    databases = {'default'}
+
+    def alter(self, old, new, batch_size, statements, failing_sql=None):
+        """
+        Alter ``old`` into ``new``, recording the statements emitted, and
+        return whether the online path was taken. Statements starting with
+        ``failing_sql`` raise ValueError.
+        """
+        attrs = {'__module__': __name__, 'Meta': type('Meta', (), {'db_table': 'item'})}
+        model_id = next(_model_ids)
+        old_model = type('Old%d' % model_id, (models.Model,), dict(attrs, qty=old))
+        new_model = type('New%d' % model_id, (models.Model,), dict(attrs, qty=new))
+        old_field, new_field = old_model._meta.get_field('qty'), new_model._meta.get_field('qty')
+
+        def record(sql, params=()):
+            statements.append(str(sql))
+            if failing_sql and str(sql).startswith(failing_sql):
+                raise ValueError('cast failed')
+
+        def cursor():
+            recording = RecordingCursor(statements, [(1, 10)])
+            recording.execute = record
+            return recording
+
+        options = dict(connection.settings_dict['OPTIONS'], online_alter_batch_size=batch_size)
+        with mock.patch.dict(connection.settings_dict, OPTIONS=options), \
+                mock.patch.object(connection, 'cursor', cursor), \
+                mock.patch.object(connection, 'set_autocommit', lambda autocommit: statements.append(
+                    'autocommit %s' % ('on' if autocommit else 'off'))), \
+                mock.patch.object(connection, 'commit', lambda: statements.append('COMMIT')), \
+                mock.patch.object(connection, 'rollback', lambda: statements.append('ROLLBACK')), \
+                mock.patch('django_dbmaker.schema.transaction.atomic', lambda using=None: contextlib.nullcontext()):
+            editor = connection.schema_editor()
+            editor.execute = record
+            editor._constraint_names = lambda *args, **kwargs: []
+            online = editor._can_alter_type_online(old_model, old_field, new_field)
+            editor.alter_field(old_model, old_field, new_field)
+        return online
+
+    def test_online_path_keeps_check_constraints(self):
+        cases = [
+            (models.CharField(max_length=10), models.IntegerField(), True),
+            (models.IntegerField(), models.BigIntegerField(), True),
+            (models.CharField(max_length=10, null=True), models.TextField(null=True), True),
+            (models.CharField(max_length=10), models.PositiveIntegerField(), False),
+            (models.PositiveIntegerField(), models.IntegerField(), False),
+            (models.PositiveSmallIntegerField(), models.PositiveIntegerField(), False),
+        ]
+        for old, new, online in cases:
+            with self.subTest(old=type(old).__name__, new=type(new).__name__):
+                plain, shadowed = [], []
+                self.alter(old.clone(), new.clone(), None, plain)
+                self.assertEqual(self.alter(old.clone(), new.clone(), 1000, shadowed), online)
+                self.assertEqual(checks(shadowed), checks(plain))
+
+    def test_catch_up_and_swap_under_lock(self):
+        statements = []
+        self.assertTrue(self.alter(
+            models.CharField(max_length=10, null=True), models.TextField(null=True), 1000, statements,
+        ))
+        lock = statements.index('LOCK TABLE "item" IN EXCLUSIVE MODE')
+        catch_up = statements.index(
+            'UPDATE "item" SET "qty__new" = "qty" WHERE "qty__new" <> "qty" '
+            'OR ("qty__new" IS NULL AND "qty" IS NOT NULL) '
+            'OR ("qty__new" IS NOT NULL AND "qty" IS NULL)'
+        )
+        drop = statements.index('ALTER TABLE "item" DROP COLUMN "qty" CASCADE')
+        rename = statements.index('ALTER TABLE "item" MODIFY "qty__new" NAME TO "qty"')
+        self.assertEqual(statements[lock - 1], 'autocommit off')
+        self.assertLess(lock, catch_up)
+        self.assertLess(catch_up, drop)
+        self.assertEqual(statements[rename + 1:], ['COMMIT', 'autocommit on'])
+
+    def test_shadow_dropped_when_copy_fails(self):
+        statements = []
+        with self.assertRaisesMessage(ValueError, 'cast failed'):
+            self.alter(models.CharField(max_length=10), models.IntegerField(), 1000, statements, 'UPDATE')
+        self.assertEqual(statements[-1], 'ALTER TABLE "item" DROP COLUMN "qty__new" CASCADE')
+        self.assertNotIn('ALTER TABLE "item" DROP COLUMN "qty" CASCADE', statements)
@@ -0,0 +1,68 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import SimpleTestCase
+
+from .models import Book
+
+
+class IndexesDroppedTests(SimpleTestCase):
+    # The connection is used, with its cursor replaced.
+    databases = {'default'}
+
+    def setUp(self):
+        self.statements = []
+        self.editor = connection.schema_editor()
+        self.editor.execute = lambda sql, params=(): self.statements.append(str(sql))
+        names = [str(statement.parts['name']).strip('"').lower()
+                 for statement in self.editor._model_indexes_sql(Book)]
+        names.append(str(self.editor._create_fk_sql(
+            Book, Book._meta.get_field('author'), '_fk_%(to_table)s_%(to_column)s',
+        ).parts['name']).strip('"').lower())
+        patcher = mock.patch.object(connection.introspection, 'get_constraints', lambda cursor, table: names)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cursor = mock.patch.object(connection, 'cursor', mock.MagicMock())
+        cursor.start()
+        self.addCleanup(cursor.stop)
+
+    def test_rebuilt_after_the_block(self):
+        with self.editor.indexes_dropped(Book):
+            dropped = list(self.statements)
+        self.assertEqual(len(dropped), 2)
+        self.assertTrue(dropped[0].startswith('DROP INDEX'))
+        self.assertEqual(len(self.statements), 4)
+        self.assertTrue(self.statements[2].startswith('CREATE INDEX'))
+        self.assertIn('FOREIGN KEY', self.statements[3])
+
+    def test_error_of_the_block_raised(self):
+        with self.assertRaisesMessage(ValueError, 'load failed'):
+            with self.editor.indexes_dropped(Book):
+                raise ValueError('load failed')
+        self.assertEqual(len(self.statements), 4)
+
+    def test_error_of_the_block_wins_over_the_rebuild(self):
+        with mock.patch.object(self.editor, 'run_deferred_sql', side_effect=RuntimeError('rebuild failed')), \
+                self.assertLogs('django.db.backends.schema', 'ERROR'), \
+                self.assertRaisesMessage(ValueError, 'load failed'):
+            with self.editor.indexes_dropped(Book):
+                raise ValueError('load failed')
+
+
+class MapOnCopiesTests(SimpleTestCase):
+    # The connection is used, with its copies replaced.
+    databases = {'default'}
+
+    def test_results_in_order_and_copies_closed(self):
+        copies = []
+
+        def copy():
+            copies.append(mock.MagicMock())
+            return copies[-1]
+
+        with mock.patch.object(connection, 'copy', copy):
+            results = connection.map_on_copies(lambda cursor, chunk: sum(chunk), [[1, 2], [3], [4, 5]])
+        self.assertEqual(results, [3, 3, 9])
+        self.assertEqual(len(copies), 3)
+        for copied in copies:
+            copied.close.assert_called_once_with()
@@ -0,0 +1,47 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import SimpleTestCase
+
+from django_dbmaker.base import CursorWrapper
+from django_dbmaker.compiler import SQLInsertCompiler
+
+from .utils import RecordingCursor
+
+
+class SchemaChangeTests(SimpleTestCase):
+    # The connection is used, with its cursor replaced.
+    databases = {'default'}
+
+    def setUp(self):
+        connection.written_tables.forget()
+        connection.temp_tables.clear()
+        self.ddl_log = []
+        patches = [
+            mock.patch.object(connection, 'ddl_log', self.ddl_log),
+            mock.patch.object(connection, 'invalidate_schema_snapshot'),
+            mock.patch.object(connection, 'get_autocommit', lambda: True),
+            mock.patch.object(connection, 'on_commit', lambda func: func()),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.cursor = CursorWrapper(RecordingCursor([]), connection)
+
+    def test_stage_table_of_ignore_conflicts(self):
+        stage = {'stage': '"tests_book_stage"', 'definition': '"title" nvarchar(100)'}
+        self.cursor.execute('DELETE FROM "tests_book"')
+        for sql in (SQLInsertCompiler.sql_create_stage % stage, SQLInsertCompiler.sql_drop_stage % stage):
+            self.assertFalse(connection.is_schema_change(sql))
+            self.cursor.execute(sql)
+        self.assertEqual(self.ddl_log, [])
+        connection.invalidate_schema_snapshot.assert_not_called()
+        self.assertTrue(connection.written_tables.is_empty('tests_book'))
+        self.assertEqual(connection.temp_tables, set())
+
+    def test_dropping_other_tables(self):
+        self.cursor.execute('DELETE FROM "tests_book"')
+        self.cursor.execute('DROP TABLE "tests_book_stage"')
+        self.assertEqual(self.ddl_log, [('DROP TABLE "tests_book_stage"', ())])
+        connection.invalidate_schema_snapshot.assert_called_once_with('DROP TABLE "tests_book_stage"')
+        self.assertFalse(connection.written_tables.is_empty('tests_book'))
@@ -0,0 +1,30 @@
+class RecordingCursor:
+    """
+    Stands in for connection.cursor(): records the statements executed.
+    Fetches return ``rows``, or what ``results(sql)`` returns for the last
+    statement.
+    """
+    def __init__(self, statements, rows=(), results=None):
+        self.statements = statements
+        self.rows = list(rows)
+        self.results = results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def execute(self, sql, params=()):
+        self.statements.append(str(sql))
+        if self.results is not None:
+            self.rows = list(self.results(str(sql)))
+
+    def executemany(self, sql, param_list):
+        self.statements.append((str(sql), list(param_list)))
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows